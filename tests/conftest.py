@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# 测试直接导入仓库根目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_image():
+    """返回生成测试图片的函数：按需创建所在目录，返回图片路径"""
+    def make(path, color=(200, 100, 50), size=(48, 32)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGB', size, color).save(path)
+        return path
+    return make
@@ -0,0 +1,20 @@
+from watermark_cache import LRUCache
+
+
+def test_replace_only_swaps_the_expected_value():
+    cache = LRUCache(4, max_bytes=100, sizeof=len)
+    original = "x" * 40
+    cache.put("a", original)
+    cache.put("b", "y" * 10)
+    hits = cache.stats()["hits"]
+
+    assert not cache.replace("a", "other", "z")
+    assert cache.replace("a", original, "x" * 4)
+    assert cache.stats()["bytes"] == 14
+    # 不计入命中统计，也不改变使用顺序（"a" 仍然最先被淘汰）
+    assert cache.stats()["hits"] == hits
+    cache.put("c", "c" * 90)
+    assert "a" not in cache and "b" in cache and "c" in cache
+
+    assert not cache.replace("missing", None, "v")
+    assert "missing" not in cache
@@ -0,0 +1,38 @@
+import os
+import json
+
+from PIL import Image
+
+from watermark_cli import main
+from watermark_export import source_subfolders
+
+
+def write_template(folder, **settings):
+    path = os.path.join(folder, "template.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"shared_settings": dict({"text": "test"}, **settings)}, f)
+    return path
+
+
+def test_batch_mirrors_input_subfolders(tmp_path, make_image):
+    input_path, output_path = str(tmp_path / "in"), str(tmp_path / "out")
+    make_image(os.path.join(input_path, "a.jpg"), (255, 0, 0))
+    make_image(os.path.join(input_path, "sub", "a.jpg"), (0, 0, 255))
+    template = write_template(str(tmp_path))
+
+    assert main(["batch", "--template", template, "--in", input_path, "--out", output_path, "--workers", "1"]) == 0
+
+    # 同名图片分别输出到对应的子文件夹，不会互相覆盖
+    with Image.open(os.path.join(output_path, "a_watermarked.jpg")) as top:
+        assert top.getpixel((0, 0))[0] > 200
+    with Image.open(os.path.join(output_path, "sub", "a_watermarked.jpg")) as nested:
+        assert nested.getpixel((0, 0))[2] > 200
+
+
+def test_source_subfolders_with_several_folders(tmp_path):
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    images = [os.path.join(first, "a.jpg"), os.path.join(first, "x", "a.jpg"), os.path.join(second, "a.jpg")]
+
+    assert source_subfolders(images[:2], [first]) == {images[1]: "x"}
+    assert source_subfolders(images, [first, second]) == {
+        images[0]: "first", images[1]: os.path.join("first", "x"), images[2]: "second"}
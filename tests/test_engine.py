@@ -0,0 +1,50 @@
+from PIL import Image, ImageChops, ImageDraw
+
+from watermark_engine import WatermarkRenderer, DEFAULT_SHARED_SETTINGS, parse_color
+
+
+def draw_per_offset(layer, settings):
+    """旧的绘制方式：描边和粗体在每个偏移位置各绘制一次文字"""
+    text = settings["text"]
+    alpha = int(255 * settings["opacity"] / 100)
+    rgb = parse_color(settings["color"], (255, 255, 255))
+    outline_rgb = parse_color(settings["outline_color"], (0, 0, 0))
+    outline_width = settings["outline_width"]
+    x = y = layer.margin
+
+    image = Image.new('RGBA', layer.image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    if settings["outline"] and outline_width > 0:
+        for dx in range(-outline_width, outline_width + 1):
+            for dy in range(-outline_width, outline_width + 1):
+                if dx != 0 or dy != 0:
+                    draw.text((x + dx, y + dy), text, font=layer.font, fill=outline_rgb + (alpha,))
+    if settings["bold"]:
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dx != 0 or dy != 0:
+                    draw.text((x + dx, y + dy), text, font=layer.font, fill=rgb + (alpha,))
+    draw.text((x, y), text, font=layer.font, fill=rgb + (alpha,))
+    return image
+
+
+def flatten(layer_image):
+    canvas = Image.new('RGB', layer_image.size, (128, 128, 128))
+    canvas.paste(layer_image, (0, 0), layer_image)
+    return canvas
+
+
+def test_dilated_outline_and_bold_match_per_offset_drawing():
+    renderer = WatermarkRenderer()
+    cases = [(outline, outline_width, bold, opacity)
+             for outline, outline_width in ((False, 0), (True, 1), (True, 2), (True, 3))
+             for bold in (False, True) for opacity in (100, 60)]
+    for case in cases:
+        outline, outline_width, bold, opacity = case
+        settings = dict(DEFAULT_SHARED_SETTINGS, text="Wm 42", font_size=24, opacity=opacity,
+                        color="#FFEE00", outline=outline, outline_color="#102030",
+                        outline_width=outline_width, bold=bold)
+        layer = renderer.build_text_layer(settings)
+        expected = flatten(draw_per_offset(layer, settings))
+        difference = ImageChops.difference(flatten(layer.image), expected)
+        assert max(high for _, high in difference.getextrema()) <= 3, case
@@ -0,0 +1,37 @@
+import os
+import threading
+
+import watermark_fonts
+from watermark_engine import DEFAULT_SHARED_SETTINGS
+from watermark_export import ExportJob, run_parallel_export, merge_cache_stats
+
+
+def test_parallel_export_while_font_index_lock_is_held(tmp_path, make_image):
+    # 主进程中其它线程持有字体索引锁时启动进程池，子进程不能继承这把锁而卡死
+    images = [make_image(str(tmp_path / f"img{index}.jpg"), (index * 20, 120, 200)) for index in range(2)]
+    output_path = str(tmp_path / "out")
+    job = ExportJob(images, output_path, dict(DEFAULT_SHARED_SETTINGS, text="test"))
+    results = []
+
+    def export():
+        run_parallel_export(job, 2, lambda image_path, error, result: results.append((image_path, error)))
+
+    with watermark_fonts._font_index_lock:
+        thread = threading.Thread(target=export, daemon=True)
+        thread.start()
+        thread.join(timeout=120)
+
+    assert not thread.is_alive(), "导出卡住"
+    assert sorted(results) == [(path, None) for path in images]
+    assert sorted(os.listdir(output_path)) == ["img0_watermarked.jpg", "img1_watermarked.jpg"]
+
+
+def test_worker_cache_stats_show_shared_text_layer(tmp_path, make_image):
+    # 共享设置相同的图片只渲染一次文本图层
+    images = [make_image(str(tmp_path / f"img{index}.jpg"), (index * 20, 120, 200)) for index in range(3)]
+    job = ExportJob(images, str(tmp_path / "out"), dict(DEFAULT_SHARED_SETTINGS, text="test"))
+    worker_stats = {}
+    assert run_parallel_export(job, 1, worker_stats=worker_stats) == 3
+
+    stats = merge_cache_stats(worker_stats.values())["text_layer"]
+    assert (stats["misses"], stats["hits"]) == (1, 2)
@@ -0,0 +1,16 @@
+import os
+
+from watermark_fonts import FontIndex
+
+
+def test_font_index_save_uses_per_process_temp_file(tmp_path):
+    index_path = str(tmp_path / "fonts.json")
+    # 另一个进程残留的临时文件不受影响
+    other_temp = tmp_path / ".fonts.json.1.tmp"
+    other_temp.write_text("{}")
+
+    index = FontIndex(index_path, [str(tmp_path / "fonts")]).load()
+    assert not index.loaded_from_disk
+    assert sorted(os.listdir(tmp_path)) == [".fonts.json.1.tmp", "fonts.json"]
+
+    assert FontIndex(index_path, [str(tmp_path / "fonts")]).load().loaded_from_disk
@@ -0,0 +1,146 @@
+import os
+import signal
+import multiprocessing
+
+import pytest
+from PIL import Image
+
+import watermark_engine
+from watermark_engine import WatermarkRenderer
+from watermark_export import ExportJob, recover_journal
+from watermark_manifest import ExportManifest, ExportJournal, ExportRecorder, JOURNAL_NAME
+
+
+def entry(image_path):
+    stat = os.stat(image_path)
+    return {"source": image_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": "0", "settings": "s"}
+
+
+def test_journal_round_trip(tmp_path, make_image):
+    images = [make_image(str(tmp_path / "in" / f"img{index}.jpg"), (index * 40, 100, 50)) for index in range(2)]
+    output_path = str(tmp_path / "out")
+    job = ExportJob(images, output_path, {"text": "test"})
+    journal = ExportJournal(output_path)
+    journal.start(job.to_dict())
+    journal.add(images[0], os.path.join(output_path, "img0_watermarked.jpg"), entry(images[0]))
+    # 中断时可能留下不完整的最后一行
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"image": "')
+
+    job_data, completed = journal.load()
+    assert ExportJob.from_dict(job_data).images == job.images
+    assert [record["image"] for record in completed] == [images[0]]
+
+    journal.finish()
+    assert not journal.exists()
+    assert journal.load() == (None, [])
+
+
+def test_recover_journal_adds_completed_images_to_manifest(tmp_path, make_image):
+    images = [make_image(str(tmp_path / "in" / f"img{index}.jpg"), (index * 40, 100, 50)) for index in range(3)]
+    output_path = str(tmp_path / "out")
+    journal = ExportJournal(output_path)
+    journal.start(ExportJob(images, output_path, {"text": "test"}).to_dict())
+    for image_path in images[:2]:
+        name = os.path.splitext(os.path.basename(image_path))[0] + "_watermarked.jpg"
+        journal.add(image_path, os.path.join(output_path, name), entry(image_path))
+
+    manifest = ExportManifest(output_path)
+    job, completed = recover_journal(journal, manifest)
+    assert job.images == tuple(images)
+    assert completed == set(images[:2])
+    assert sorted(manifest.entries) == ["img0_watermarked.jpg", "img1_watermarked.jpg"]
+
+    assert recover_journal(ExportJournal(str(tmp_path / "empty")), manifest) == (None, set())
+
+
+def test_recorder_keeps_journal_until_finished(tmp_path, make_image):
+    images = [make_image(str(tmp_path / "in" / f"img{index}.jpg"), (index * 40, 100, 50)) for index in range(1)]
+    output_path = str(tmp_path / "out")
+    job = ExportJob(images, output_path, {"text": "test"})
+    output_filepath = WatermarkRenderer().export_image(images[0], output_path, job.settings_for(images[0]))
+
+    manifest = ExportManifest(output_path)
+    journal = ExportJournal(output_path)
+    journal.start(job.to_dict())
+    recorder = ExportRecorder(manifest, journal, {images[0]: "fingerprint"})
+    recorder.record(images[0], output_filepath)
+
+    # 未完成（取消或中断）时保存清单，保留日志
+    recorder.close(finished=False)
+    assert journal.exists()
+    assert [record["image"] for record in journal.load()[1]] == images
+    assert ExportManifest(output_path).is_current(images[0], "img0_watermarked.jpg", "fingerprint")
+
+    recorder.close(finished=True)
+    assert not journal.exists()
+
+
+def test_journal_survives_broken_pool(tmp_path, make_image):
+    gui = pytest.importorskip("watermark_gui")
+    images = [make_image(str(tmp_path / "in" / f"img{index}.jpg"), (index * 40, 100, 50)) for index in range(4)]
+    output_path = str(tmp_path / "out")
+    job = ExportJob(images, output_path, {"text": "test"})
+    manifest = ExportManifest(output_path)
+    journal = ExportJournal(output_path)
+    journal.start(job.to_dict())
+
+    thread = gui.ParallelWatermarkThread(job, 1, ExportRecorder(manifest, journal, {path: "s" for path in images}))
+    on_result = thread.on_result
+
+    # 第一张图片完成后杀掉导出子进程
+    def on_result_and_kill(image_path, error, result):
+        on_result(image_path, error, result)
+        for child in multiprocessing.active_children():
+            os.kill(child.pid, signal.SIGKILL)
+
+    thread.on_result = on_result_and_kill
+    errors = []
+    thread.error.connect(errors.append)
+    thread.run()
+
+    assert thread.interrupted and errors
+    assert os.path.exists(os.path.join(output_path, JOURNAL_NAME))
+    job_data, completed = ExportJournal(output_path).load()
+    assert job_data is not None
+    assert 1 <= len(completed) < len(images)
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def test_save_image_leaves_no_partial_output(tmp_path, monkeypatch):
+    output_filepath = str(tmp_path / "out.jpg")
+    Image.new('RGB', (8, 8), (0, 0, 255)).save(output_filepath)
+    with open(output_filepath, 'rb') as f:
+        original = f.read()
+
+    def interrupt(fd):
+        raise Interrupted()
+
+    monkeypatch.setattr(watermark_engine.os, "fsync", interrupt)
+    with pytest.raises(Interrupted):
+        WatermarkRenderer().save_image(Image.new('RGB', (64, 64), (255, 0, 0)), output_filepath, {})
+
+    # 原有输出保持不变，也没有残留的临时文件
+    assert os.listdir(tmp_path) == ["out.jpg"]
+    with open(output_filepath, 'rb') as f:
+        assert f.read() == original
+
+
+def test_remove_temp_files_only_removes_own_temp_files(tmp_path, make_image):
+    input_path, output_path = str(tmp_path / "in"), str(tmp_path / "out")
+    images = [make_image(os.path.join(input_path, f"img{index}.jpg")) for index in range(2)]
+    job = ExportJob(images, output_path, {"text": "test"})
+    os.makedirs(os.path.join(output_path, "other"))
+    own = [".img0_watermarked.jpg.1234.tmp", ".img1_watermarked.jpg.99.tmp", ".watermark_manifest.json.tmp"]
+    foreign = [".img0_watermarked.jpg.tmp", ".download.part.tmp", ".img2_watermarked.jpg.5.tmp",
+               os.path.join("other", ".img0_watermarked.jpg.1234.tmp")]
+    for name in own + foreign:
+        open(os.path.join(output_path, name), 'w').close()
+
+    ExportJournal(output_path).remove_temp_files(job.output_filepaths())
+    remaining = {os.path.relpath(os.path.join(root, name), output_path)
+                 for root, dirs, files in os.walk(output_path) for name in files}
+    assert remaining == set(foreign)
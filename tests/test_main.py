@@ -0,0 +1,43 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_without_qt(tmp_path, *args):
+    """运行 main.py，PyQt5 无法导入（模拟服务器环境）"""
+    stub = tmp_path / "stub" / "PyQt5"
+    stub.mkdir(parents=True)
+    (stub / "__init__.py").write_text("raise ImportError('PyQt5 不可用')\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path / "stub"), ROOT]))
+    return subprocess.run([sys.executable, os.path.join(ROOT, "main.py")] + list(args), env=env,
+                          capture_output=True, text=True, timeout=300)
+
+
+def prepare(tmp_path, make_image):
+    input_path = tmp_path / "in"
+    for index in range(3):
+        make_image(str(input_path / f"img{index}.jpg"), (index * 60, 100, 50))
+    template = tmp_path / "template.json"
+    template.write_text(json.dumps({"shared_settings": {"text": "test"}}))
+    return str(input_path), str(tmp_path / "out"), str(template)
+
+
+def test_batch_runs_without_qt(tmp_path, make_image):
+    input_path, output_path, template = prepare(tmp_path, make_image)
+    result = run_without_qt(tmp_path, "batch", "--template", template, "--in", input_path,
+                            "--out", output_path, "--workers", "2")
+    assert result.returncode == 0, result.stderr
+    assert sorted(name for name in os.listdir(output_path) if not name.startswith(".")) == [
+        "img0_watermarked.jpg", "img1_watermarked.jpg", "img2_watermarked.jpg"]
+
+
+def test_watch_runs_without_qt(tmp_path, make_image):
+    input_path, output_path, template = prepare(tmp_path, make_image)
+    result = run_without_qt(tmp_path, "watch", "--template", template, "--in", input_path, "--out", output_path,
+                            "--workers", "2", "--once", "--settle", "0", "--interval", "0.1")
+    assert result.returncode == 0, result.stderr
+    assert sorted(name for name in os.listdir(output_path) if not name.startswith(".")) == [
+        "img0_watermarked.jpg", "img1_watermarked.jpg", "img2_watermarked.jpg"]
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from watermark_engine import WatermarkRenderer
+from watermark_export import ExportJob, export_image, plan_incremental_export, source_subfolders
+from watermark_manifest import ExportManifest
+
+
+def export_stale(job, manifest):
+    """按计划导出需要重新导出的图片并写入清单，返回 (重新导出的图片, 跳过的数量)"""
+    stale, skipped, fingerprints = plan_incremental_export(job, manifest)
+    renderer = WatermarkRenderer()
+    for image_path in stale.images:
+        manifest.record(image_path, export_image(renderer, stale, image_path), fingerprints[image_path])
+    manifest.save()
+    return list(stale.images), skipped
+
+
+@pytest.fixture
+def exported(tmp_path, make_image):
+    images = [make_image(str(tmp_path / "in" / f"img{index}.jpg"), (index * 60, 100, 50)) for index in range(3)]
+    output_path = str(tmp_path / "out")
+    job = ExportJob(images, output_path, {"text": "test"})
+    assert export_stale(job, ExportManifest(output_path)) == (images, 0)
+    return job
+
+
+def test_unchanged_images_are_skipped(exported):
+    assert export_stale(exported, ExportManifest(exported.output_path)) == ([], 3)
+
+
+def test_changed_settings_rebuild_everything(exported):
+    job = ExportJob(exported.images, exported.output_path, {"text": "changed"})
+    assert export_stale(job, ExportManifest(exported.output_path)) == (list(exported.images), 0)
+
+
+def test_non_render_settings_do_not_rebuild(exported):
+    job = ExportJob(exported.images, exported.output_path, {"text": "test", "export_workers": 3})
+    assert export_stale(job, ExportManifest(exported.output_path)) == ([], 3)
+
+
+def test_changed_mtime_compares_content(exported, make_image):
+    touched, modified = exported.images[:2]
+    stat = os.stat(touched)
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    make_image(modified, (0, 255, 0))
+    stat = os.stat(modified)
+    os.utime(modified, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    # 只被touch过的图片内容相同，仍然跳过；内容变化的图片重新导出
+    assert export_stale(exported, ExportManifest(exported.output_path)) == ([modified], 2)
+    assert export_stale(exported, ExportManifest(exported.output_path)) == ([], 3)
+
+
+def test_missing_output_is_rebuilt(exported):
+    os.remove(os.path.join(exported.output_path, "img1_watermarked.jpg"))
+    assert export_stale(exported, ExportManifest(exported.output_path)) == ([exported.images[1]], 2)
+
+
+def test_same_name_in_subfolders_settles(tmp_path, make_image):
+    input_path, output_path = str(tmp_path / "in"), str(tmp_path / "out")
+    images = [make_image(os.path.join(input_path, "a.jpg")), make_image(os.path.join(input_path, "sub", "a.jpg"))]
+    job = ExportJob(images, output_path, {"text": "test"}, subfolders=source_subfolders(images, [input_path]))
+
+    assert export_stale(job, ExportManifest(output_path)) == (images, 0)
+    assert export_stale(job, ExportManifest(output_path)) == ([], 2)
+    assert sorted(ExportManifest(output_path).entries) == ["a_watermarked.jpg", os.path.join("sub", "a_watermarked.jpg")]
+
+
+def test_duplicate_outputs_are_rejected(tmp_path, make_image):
+    images = [make_image(str(tmp_path / "first" / "a.jpg")), make_image(str(tmp_path / "second" / "a.jpg"))]
+    job = ExportJob(images, str(tmp_path / "out"), {"text": "test"})
+    with pytest.raises(ValueError):
+        plan_incremental_export(job, ExportManifest(job.output_path))
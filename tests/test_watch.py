@@ -0,0 +1,71 @@
+import os
+import signal
+import multiprocessing
+
+from watermark_watch import FolderWatcher, ProcessedLedger, WATCH_LEDGER_NAME
+
+
+def test_failures_are_remembered_after_restart(tmp_path, make_image):
+    input_path, output_path = str(tmp_path / "in"), str(tmp_path / "out")
+    good = make_image(os.path.join(input_path, "good.jpg"))
+    broken = os.path.join(input_path, "broken.jpg")
+    with open(broken, 'wb') as f:
+        f.write(b"not an image")
+
+    watcher = FolderWatcher([input_path], output_path, {"text": "test"}, settle=0, workers=1)
+    ready = watcher.poll()
+    assert len(ready) == 2
+    processed, failed = watcher.process(ready)
+    assert (sorted(processed), failed) == (sorted(ready), 1)
+
+    # 重新启动后，失败的文件在内容变化前也不会再处理
+    restarted = FolderWatcher([input_path], output_path, {"text": "test"}, settle=0, workers=1)
+    assert restarted.poll() == []
+    assert [key[0] for key in restarted.ledger.failed] == [broken]
+    assert os.path.exists(os.path.join(output_path, "good_watermarked.jpg"))
+    assert good not in {key[0] for key in restarted.ledger.failed}
+
+
+def test_same_names_in_several_folders(tmp_path, make_image):
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    output_path = str(tmp_path / "out")
+    make_image(os.path.join(first, "a.jpg"))
+    make_image(os.path.join(second, "sub", "a.jpg"))
+
+    watcher = FolderWatcher([first, second], output_path, {"text": "test"}, settle=0, workers=1)
+    assert watcher.process(watcher.poll())[1] == 0
+    assert os.path.exists(os.path.join(output_path, "first", "a_watermarked.jpg"))
+    assert os.path.exists(os.path.join(output_path, "second", "sub", "a_watermarked.jpg"))
+
+
+def test_broken_pool_does_not_stop_watching(tmp_path, make_image):
+    input_path, output_path = str(tmp_path / "in"), str(tmp_path / "out")
+    images = [make_image(os.path.join(input_path, f"img{index}.jpg")) for index in range(4)]
+    watcher = FolderWatcher([input_path], output_path, {"text": "test"}, settle=0, workers=1)
+
+    # 第一张图片完成后杀掉导出子进程
+    add = watcher.ledger.add
+    killed = []
+
+    def add_and_kill(key, *args, **kwargs):
+        add(key, *args, **kwargs)
+        if not killed:
+            for child in multiprocessing.active_children():
+                os.kill(child.pid, signal.SIGKILL)
+                killed.append(child.pid)
+
+    watcher.ledger.add = add_and_kill
+    batches = []
+    # 下一轮用新的进程池处理剩余的文件；每个文件只统计一次
+    watcher.run(interval=0, once=True, on_batch=lambda count, failed, elapsed, nbytes: batches.append((count, failed)))
+    assert killed
+    assert len(batches) == 2
+    assert watcher.poll() == []
+
+    ledger = ProcessedLedger(os.path.join(output_path, WATCH_LEDGER_NAME))
+    assert {key[0] for key in ledger.entries} == set(images)
+    assert sum(count for count, _ in batches) == len(images)
+    assert sum(failed for _, failed in batches) == len(ledger.failed)
+    for key in ledger.entries - ledger.failed:
+        name = os.path.splitext(os.path.basename(key[0]))[0]
+        assert os.path.exists(os.path.join(output_path, f"{name}_watermarked.jpg"))
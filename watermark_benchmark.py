@@ -0,0 +1,333 @@
+import io
+import os
+import gc
+import sys
+import json
+import math
+import time
+import random
+import tempfile
+import argparse
+import platform
+import itertools
+import statistics
+import PIL
+from PIL import Image
+
+from watermark_engine import WatermarkRenderer, DEFAULT_SHARED_SETTINGS, resolve_settings
+
+# 性能基准 - 生成可复现的合成图片集，测量渲染和导出热点路径的耗时，不依赖Qt
+#   python watermark_benchmark.py run --out baseline.json
+#   python watermark_benchmark.py compare baseline.json [current.json] --threshold 0.1
+
+CORPUS_DIR = os.path.join(tempfile.gettempdir(), "watermark_benchmark_corpus")
+CORPUS_VERSION = 1
+CORPUS_SIZES = (2, 12, 24, 50)
+# 变体：名称 -> (图片模式, 文件格式, EXIF方向)
+CORPUS_VARIANTS = {
+    "rgb": ("RGB", "JPEG", 1),
+    "rgba": ("RGBA", "PNG", 1),
+    "palette": ("P", "PNG", 1),
+    "rotated": ("RGB", "JPEG", 6),
+}
+# 文本水印效果组合
+TEXT_EFFECTS = ("shadow", "outline", "italic", "bold")
+BASELINE_VERSION = 1
+
+
+def corpus_size(megapixels):
+    """按3:2的比例换算图片尺寸"""
+    width = int(math.sqrt(megapixels * 1000000 * 1.5))
+    return width, int(width / 1.5)
+
+
+def synthetic_image(size, seed):
+    """生成固定内容的测试图片：随机噪声平铺后与渐变混合，编码开销接近真实照片"""
+    rng = random.Random(seed)
+    tile = Image.frombytes("RGB", (256, 256), rng.randbytes(256 * 256 * 3))
+    noise = Image.new("RGB", size)
+    for x in range(0, size[0], 256):
+        for y in range(0, size[1], 256):
+            noise.paste(tile, (x, y))
+    gradient = Image.merge("RGB", (Image.linear_gradient("L").resize(size),
+                                   Image.radial_gradient("L").resize(size),
+                                   Image.linear_gradient("L").rotate(90).resize(size)))
+    return Image.blend(noise, gradient, 0.7)
+
+
+def corpus_path(corpus_dir, megapixels, variant):
+    ext = ".jpg" if CORPUS_VARIANTS[variant][1] == "JPEG" else ".png"
+    return os.path.join(corpus_dir, f"v{CORPUS_VERSION}_{megapixels}mp_{variant}{ext}")
+
+
+def build_corpus(corpus_dir=CORPUS_DIR, sizes=CORPUS_SIZES):
+    """生成缺少的测试图片和水印Logo，返回Logo路径；已存在的文件直接复用"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    for megapixels in sizes:
+        base = None
+        for variant, (mode, format, orientation) in CORPUS_VARIANTS.items():
+            path = corpus_path(corpus_dir, megapixels, variant)
+            if os.path.exists(path):
+                continue
+            print(f"生成测试图片 {os.path.basename(path)}")
+            if base is None:
+                base = synthetic_image(corpus_size(megapixels), megapixels)
+
+            if mode == "RGBA":
+                image = base.copy()
+                image.putalpha(Image.radial_gradient("L").resize(base.size))
+            elif mode == "P":
+                image = base.quantize(256)
+            elif orientation != 1:
+                # 像素按传感器方向保存，EXIF要求旋转后显示
+                image = base.transpose(Image.Transpose.ROTATE_90)
+            else:
+                image = base
+
+            exif = Image.Exif()
+            if orientation != 1:
+                exif[0x0112] = orientation
+            temp_path = path + ".tmp"
+            if format == "JPEG":
+                image.save(temp_path, format, quality=90, exif=exif)
+            else:
+                image.save(temp_path, format)
+            os.replace(temp_path, path)
+
+    logo_path = os.path.join(corpus_dir, f"v{CORPUS_VERSION}_logo.png")
+    if not os.path.exists(logo_path):
+        logo = synthetic_image((600, 200), 0).convert("RGBA")
+        logo.putalpha(Image.radial_gradient("L").resize(logo.size))
+        logo.save(logo_path)
+    return logo_path
+
+
+def measure(fn, setup=None, repeat=3):
+    """运行 repeat 次，返回每次的耗时（秒）；setup 的返回值作为 fn 的参数，不计入耗时"""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def effect_name(effects):
+    return "+".join(effects) if effects else "plain"
+
+
+def benchmark_cases(corpus_dir, logo_path, sizes, renderer):
+    """返回 (名称, fn, setup) 列表"""
+    cases = []
+    for megapixels in sizes:
+        for variant in CORPUS_VARIANTS:
+            path = corpus_path(corpus_dir, megapixels, variant)
+            tag = f"{megapixels}MP-{variant}"
+
+            def open_unrotated(path=path):
+                image = Image.open(path)
+                image.load()
+                return image
+
+            # load_image 对RGB图片是延迟解码的，需要调用 load() 才会真正解码
+            cases.append((f"load/{tag}", lambda path=path: renderer.load_image(path).load(), None))
+            cases.append((f"orientation/{tag}", renderer.fix_image_orientation, open_unrotated))
+
+        # 水印和编码只与RGB图片的尺寸有关
+        path = corpus_path(corpus_dir, megapixels, "rgb")
+        tag = f"{megapixels}MP"
+        source = renderer.load_image(path)
+        source.load()
+        width = source.width
+
+        base = resolve_settings({"font_size": max(40, width // 25), "outline_width": max(1, width // 800),
+                                 "shadow_offset": max(2, width // 600), "text": "© PhotoWatermark 2024"})
+
+        resize_settings = dict(base, resize_enabled=True, resize_mode="percent", resize_percent=50)
+        cases.append((f"resize/{tag}", lambda image, s=resize_settings: renderer.resize_image(image, s),
+                      lambda source=source: source))
+
+        def fresh_copy(source=source):
+            # 文本和Logo水印直接绘制在图片上，每次使用新的副本；清空图层缓存以测量完整的图层生成
+            renderer.text_layer_cache.clear()
+            renderer.logo_cache.clear()
+            return source.copy()
+
+        for count in range(len(TEXT_EFFECTS) + 1):
+            for effects in itertools.combinations(TEXT_EFFECTS, count):
+                settings = dict(base, **{effect: True for effect in effects})
+                cases.append((f"text/{effect_name(effects)}/{tag}",
+                              lambda image, s=settings: renderer.add_text_watermark(image, s), fresh_copy))
+
+        # 批量导出时图层已缓存，只剩粘贴
+        def cached_copy(source=source, settings=dict(base, shadow=True, outline=True)):
+            renderer.get_text_layer(settings)
+            return source.copy()
+
+        cases.append((f"text/cached/{tag}",
+                      lambda image, s=dict(base, shadow=True, outline=True): renderer.add_text_watermark(image, s),
+                      cached_copy))
+
+        for rotation in (0, 30):
+            settings = dict(base, type="image", image_path=logo_path, image_scale=max(100, width // 30),
+                            rotation=rotation)
+            cases.append((f"logo/rotation{rotation}/{tag}",
+                          lambda image, s=settings: renderer.add_image_watermark(image, s), fresh_copy))
+
+        for format in ("JPEG", "PNG"):
+            settings = dict(base, output_format=format)
+            cases.append((f"encode/{format.lower()}/{tag}",
+                          lambda image, s=settings: encode(image, s), lambda source=source: source))
+    return cases
+
+
+def encode(image, settings):
+    """按导出参数编码到内存（与 save_image 相同的编码选项，不计入磁盘写入）"""
+    buffer = io.BytesIO()
+    format = settings.get("output_format", "JPEG")
+    if format == "JPEG":
+        image.save(buffer, format, quality=settings.get("quality", 90), optimize=True)
+    else:
+        image.save(buffer, format, optimize=True)
+    return buffer
+
+
+def run_benchmarks(corpus_dir=CORPUS_DIR, sizes=CORPUS_SIZES, repeat=3, name_filter=None, font_path=None):
+    """运行所有基准，返回结果字典（可保存为JSON基线）
+
+    font_path 指定文本水印使用的字体文件，不指定时与导出相同（按字体族查找）。
+    不同机器上的字体不同，比较结果时应使用同一字体。
+    """
+    logo_path = build_corpus(corpus_dir, sizes)
+    renderer = WatermarkRenderer()
+    font_family = DEFAULT_SHARED_SETTINGS["font_family"]
+    if font_path:
+        renderer.font_sources[font_family] = font_path
+    font = renderer.resolve_font_source(font_family)
+    if font is None:
+        print("警告: 没有找到TrueType字体，文本水印使用默认位图字体，结果不代表实际性能（使用 --font 指定字体）",
+              file=sys.stderr)
+    results = {}
+
+    for name, fn, setup in benchmark_cases(corpus_dir, logo_path, sizes, renderer):
+        if name_filter and name_filter not in name:
+            continue
+        times = measure(fn, setup, repeat)
+        results[name] = {"median": statistics.median(times), "min": min(times), "runs": len(times)}
+        print(f"{name:<40} {results[name]['median'] * 1000:>10.1f} ms")
+
+    return {
+        "version": BASELINE_VERSION,
+        "environment": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "font": font,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S")
+        },
+        "options": {"sizes": list(sizes), "repeat": repeat, "corpus_version": CORPUS_VERSION},
+        "results": results
+    }
+
+
+def compare_results(baseline, current, threshold=0.1, min_time=0.001):
+    """比较两次结果的中位数，返回变慢超过 threshold 的基准列表 [(名称, 基线, 当前, 变化比例)]
+
+    两次都快于 min_time 秒的基准只显示，不判定为退化（计时噪声大于差异）。
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<40} {'':>10} {result['median'] * 1000:>10.1f} ms  （新增）")
+            continue
+        old, new = previous["median"], result["median"]
+        change = (new - old) / old if old > 0 else 0.0
+        regressed = change > threshold and max(old, new) >= min_time
+        flag = "  ← 退化" if regressed else ""
+        print(f"{name:<40} {old * 1000:>10.1f} {new * 1000:>10.1f} ms  {change:+7.1%}{flag}")
+        if regressed:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def parse_sizes(value):
+    return tuple(int(size) for size in value.split(",") if size.strip())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="watermark_benchmark.py", description="PhotoWatermark 性能基准")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(command):
+        command.add_argument("--sizes", type=parse_sizes, default=CORPUS_SIZES,
+                             help="测试图片尺寸（百万像素），逗号分隔，默认 2,12,24,50")
+        command.add_argument("--repeat", type=int, default=3, help="每个基准运行次数，取中位数")
+        command.add_argument("--filter", dest="name_filter", help="只运行名称包含该字符串的基准")
+        command.add_argument("--corpus", default=CORPUS_DIR, help="测试图片文件夹（不存在的图片会自动生成）")
+        command.add_argument("--font", help="文本水印使用的字体文件，默认与导出相同")
+
+    run = subparsers.add_parser("run", help="运行基准并保存结果")
+    add_run_options(run)
+    run.add_argument("--out", default="benchmark_baseline.json", help="结果文件")
+
+    compare = subparsers.add_parser("compare", help="与基线比较，变慢超过阈值时返回非零退出码")
+    add_run_options(compare)
+    compare.add_argument("baseline", help="基线结果文件")
+    compare.add_argument("current", nargs="?", help="当前结果文件；不指定时按基线的尺寸重新运行")
+    compare.add_argument("--threshold", type=float, default=0.1, help="判定为退化的变慢比例，默认0.1（10%%）")
+    compare.add_argument("--save", help="保存本次运行结果的文件")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "run":
+        results = run_benchmarks(args.corpus, args.sizes, args.repeat, args.name_filter, args.font)
+        save_results(results, args.out)
+        print(f"结果已保存到 {args.out}")
+        return 0
+
+    try:
+        baseline = load_results(args.baseline)
+        current = load_results(args.current) if args.current else None
+    except (OSError, ValueError) as e:
+        print(f"无法读取结果文件: {str(e)}", file=sys.stderr)
+        return 2
+
+    if current is None:
+        sizes = args.sizes if args.sizes != CORPUS_SIZES else tuple(baseline["options"]["sizes"])
+        current = run_benchmarks(args.corpus, sizes, args.repeat, args.name_filter, args.font)
+        if args.save:
+            save_results(current, args.save)
+
+    for key in ("font", "pillow", "cpu_count"):
+        if baseline["environment"].get(key) != current["environment"].get(key):
+            print(f"警告: 基线与本次运行的 {key} 不同（{baseline['environment'].get(key)} → "
+                  f"{current['environment'].get(key)}），结果可能不可比", file=sys.stderr)
+
+    print(f"\n{'基准':<38} {'基线':>9} {'当前':>9}")
+    regressions = compare_results(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} 个基准变慢超过 {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    print(f"\n没有变慢超过 {args.threshold:.0%} 的基准")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+
+# 缓存工具 - 供渲染引擎使用，不依赖Qt
+
+_MISSING = object()
+
+
+def image_nbytes(image):
+    """估算PIL图片占用的像素内存（字节）"""
+    return image.width * image.height * len(image.getbands())
+
+
+class LRUCache:
+    """线程安全的LRU缓存，记录命中/未命中/淘汰次数
+
+    按条目数量限制；指定 max_bytes 和 sizeof 时同时按字节数限制，
+    最近使用的一项即使超出预算也会保留。
+    """
+
+    def __init__(self, capacity=32, max_bytes=0, sizeof=None):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self.bytes -= self._sizes.pop(key, 0)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.sizeof:
+                self._sizes[key] = self.sizeof(value)
+                self.bytes += self._sizes[key]
+            self._evict()
+
+    def replace(self, key, expected, value):
+        """当前值仍是 expected 时替换为 value，返回是否替换
+
+        用于后台线程把缓存值换成等价的较小版本：不计入命中统计，也不改变使用顺序。
+        """
+        with self._lock:
+            if self._data.get(key, _MISSING) is not expected:
+                return False
+            self.bytes -= self._sizes.pop(key, 0)
+            self._data[key] = value
+            if self.sizeof:
+                self._sizes[key] = self.sizeof(value)
+                self.bytes += self._sizes[key]
+            return True
+
+    def set_max_bytes(self, max_bytes):
+        """修改字节预算，立即淘汰超出的部分"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while len(self._data) > self.capacity or (
+                self.max_bytes and self.bytes > self.max_bytes and len(self._data) > 1):
+            key, _ = self._data.popitem(last=False)
+            self.bytes -= self._sizes.pop(key, 0)
+            self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """命中时返回缓存值，否则调用 factory() 生成并缓存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def stats(self):
+        """返回命中统计"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "capacity": self.capacity,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes
+            }
+
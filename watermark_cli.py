@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+from concurrent.futures.process import BrokenProcessPool
+
+from watermark_export import (ExportJob, IMAGE_EXTENSIONS, run_parallel_export, default_worker_count,
+                              plan_incremental_export, recover_journal, source_subfolders, merge_cache_stats)
+from watermark_engine import format_cache_stats
+from watermark_manifest import ExportManifest, ExportJournal, ExportRecorder
+from watermark_watch import FolderWatcher
+from watermark_trace import tracer, summarize, format_summary
+
+# 命令行批处理 - 不依赖Qt，可在无显示环境（服务器、cron）中运行
+#   python main.py batch --template 名称 --in 输入文件夹 --out 输出文件夹
+#   python main.py watch --template 名称 --in 输入文件夹 [--in 输入文件夹 ...] --out 输出文件夹
+
+TEMPLATES_DIR = os.path.join(os.path.expanduser("~"), ".watermark_templates")
+
+
+def load_template(name):
+    """按名称从模板目录加载模板（也可以直接传入模板文件路径），返回共享设置"""
+    template_path = name if os.path.isfile(name) else os.path.join(TEMPLATES_DIR, f"{name}.json")
+    with open(template_path, 'r', encoding='utf-8') as f:
+        template = json.load(f)
+    return template.get("shared_settings", {})
+
+
+def find_images(folder, exclude=None):
+    """递归查找文件夹中所有支持的图片（跳过 exclude 文件夹），按路径排序"""
+    exclude = os.path.realpath(exclude) if exclude else None
+    image_paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(root, d)) != exclude]
+        for file in files:
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                image_paths.append(os.path.join(root, file))
+    return sorted(image_paths)
+
+
+def format_stats(total, failed, elapsed, input_bytes):
+    elapsed = max(elapsed, 1e-6)
+    return (f"共 {total} 张，成功 {total - failed} 张，失败 {failed} 张，用时 {elapsed:.2f} 秒，"
+            f"{total / elapsed:.2f} 张/秒，{input_bytes / 1024 / 1024 / elapsed:.1f} MB/秒（输入）")
+
+
+def run_batch(args):
+    if args.resume:
+        return resume_batch(args)
+    if not (args.template and args.input):
+        print("需要指定 --template 和 --in（或使用 --resume 继续上次导出）", file=sys.stderr)
+        return 2
+
+    try:
+        shared_settings = load_template(args.template)
+    except (OSError, ValueError) as e:
+        print(f"无法加载模板: {str(e)}", file=sys.stderr)
+        return 2
+
+    if not os.path.isdir(args.input):
+        print(f"输入文件夹不存在: {args.input}", file=sys.stderr)
+        return 2
+    if os.path.realpath(args.input) == os.path.realpath(args.output) and not args.force:
+        print("输出文件夹与输入文件夹相同，这可能会覆盖原文件（使用 --force 继续）", file=sys.stderr)
+        return 2
+
+    images = find_images(args.input, exclude=args.output)
+    if not images:
+        print("输入文件夹中没有找到支持的图片文件", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    # 输出文件夹中保持输入的子文件夹结构，不同子文件夹中的同名图片不会互相覆盖
+    job = ExportJob(images, args.output, shared_settings, subfolders=source_subfolders(images, [args.input]))
+    manifest = ExportManifest(args.output)
+    journal = ExportJournal(args.output)
+    recover_journal(journal, manifest)
+    # 默认增量导出：源文件和设置都未变化的输出直接跳过（--full 全部重新导出）
+    try:
+        job, skipped, fingerprints = plan_incremental_export(job, manifest, full=args.full)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    if skipped:
+        print(f"跳过 {skipped} 张未变化的图片")
+    if not job.images:
+        manifest.save()
+        journal.finish()
+        print(f"没有需要重新导出的图片，用时 {time.perf_counter() - start:.2f} 秒")
+        return 0
+
+    journal.start(job.to_dict())
+    return export_batch(job, ExportRecorder(manifest, journal, fingerprints), args.workers, start, args.trace)
+
+
+def resume_batch(args):
+    """从输出文件夹中的导出日志继续上次未完成的导出（使用上次导出时的设置）"""
+    start = time.perf_counter()
+    manifest = ExportManifest(args.output)
+    journal = ExportJournal(args.output)
+    job, completed = recover_journal(journal, manifest)
+    if job is None:
+        print(f"{args.output} 中没有未完成的导出", file=sys.stderr)
+        return 2
+
+    journal.remove_temp_files(job.output_filepaths())
+    try:
+        job, _, fingerprints = plan_incremental_export(
+            job.with_images([path for path in job.images if path not in completed]), manifest, full=True)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    print(f"上次导出已完成 {len(completed)} 张")
+    if not job.images:
+        manifest.save()
+        journal.finish()
+        return 0
+    return export_batch(job, ExportRecorder(manifest, journal, fingerprints), args.workers, start, args.trace)
+
+
+def export_batch(job, recorder, workers, start, trace_path=None):
+    workers = workers or default_worker_count()
+    if trace_path:
+        tracer.enable()
+        tracer.drain()
+    print(f"导出 {len(job.images)} 张图片到 {job.output_path}（{workers} 个进程）")
+    failed = []
+    worker_stats = {}
+
+    def on_result(image_path, error, result):
+        if error:
+            failed.append(image_path)
+            print(f"导出图片 {os.path.basename(image_path)} 失败: {error}", file=sys.stderr)
+        else:
+            recorder.record(image_path, *result)
+
+    # 中断（Ctrl+C、子进程异常退出）时保留导出日志，之后可以用 --resume 继续
+    finished = False
+    try:
+        completed = run_parallel_export(job, workers, on_result, worker_stats=worker_stats)
+        finished = True
+    except BrokenProcessPool as e:
+        print(f"{str(e)}，已完成的图片已记录，使用 --resume 继续", file=sys.stderr)
+        return 1
+    finally:
+        recorder.close(finished)
+    elapsed = time.perf_counter() - start
+
+    input_bytes = sum(os.path.getsize(path) for path in job.images if os.path.exists(path))
+    print(format_stats(completed, len(failed), elapsed, input_bytes))
+    # 设置相同的图片共用同一个文本图层，每个进程只渲染一次
+    print("渲染缓存: " + format_cache_stats(merge_cache_stats(worker_stats.values())))
+    if trace_path:
+        events = tracer.save(trace_path)
+        print(format_summary(summarize(events)))
+        print(f"计时记录已保存到 {trace_path}（可在 chrome://tracing 或 ui.perfetto.dev 中打开）")
+    return 1 if failed else 0
+
+
+def run_watch(args):
+    try:
+        shared_settings = load_template(args.template)
+    except (OSError, ValueError) as e:
+        print(f"无法加载模板: {str(e)}", file=sys.stderr)
+        return 2
+
+    for folder in args.input:
+        if not os.path.isdir(folder):
+            print(f"输入文件夹不存在: {folder}", file=sys.stderr)
+            return 2
+        if os.path.realpath(folder) == os.path.realpath(args.output):
+            print("输出文件夹不能与监视的文件夹相同", file=sys.stderr)
+            return 2
+
+    watcher = FolderWatcher(args.input, args.output, shared_settings, args.settle,
+                            args.workers or default_worker_count())
+    print(f"监视 {', '.join(watcher.folders)}，输出到 {args.output}"
+          f"（已处理 {len(watcher.ledger)} 个文件，其中失败 {len(watcher.ledger.failed)} 个）")
+
+    totals = {"images": 0, "failed": 0, "elapsed": 0.0, "bytes": 0}
+
+    def on_batch(count, failed, elapsed, input_bytes):
+        totals["images"] += count
+        totals["failed"] += failed
+        totals["elapsed"] += elapsed
+        totals["bytes"] += input_bytes
+        print(format_stats(count, failed, elapsed, input_bytes))
+
+    # 收到 SIGTERM（例如服务停止）时与 Ctrl+C 一样正常退出
+    def on_terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_terminate)
+    try:
+        watcher.run(args.interval, args.once, on_batch)
+    except KeyboardInterrupt:
+        pass
+
+    print("合计: " + format_stats(totals["images"], totals["failed"], totals["elapsed"], totals["bytes"]))
+    return 1 if totals["failed"] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="PhotoWatermark 命令行批处理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="用模板为文件夹中的所有图片添加水印")
+    batch.add_argument("--template", help="模板名称（~/.watermark_templates 中）或模板文件路径")
+    batch.add_argument("--in", dest="input", help="输入文件夹（包含子文件夹）")
+    batch.add_argument("--out", dest="output", required=True, help="输出文件夹（保持输入的子文件夹结构）")
+    batch.add_argument("--workers", type=int, default=0, help="进程数，默认等于CPU核心数")
+    batch.add_argument("--force", action="store_true", help="允许输出到输入文件夹")
+    batch.add_argument("--full", action="store_true", help="全部重新导出，不跳过未变化的图片")
+    batch.add_argument("--resume", action="store_true", help="按输出文件夹中的导出日志继续上次未完成的导出")
+    batch.add_argument("--trace", help="记录各阶段耗时，保存为Chrome Trace Event JSON文件并输出汇总")
+    batch.set_defaults(func=run_batch)
+
+    watch = subparsers.add_parser("watch", help="监视文件夹，新图片写入完成后自动添加水印")
+    watch.add_argument("--template", required=True, help="模板名称（~/.watermark_templates 中）或模板文件路径")
+    watch.add_argument("--in", dest="input", action="append", required=True, help="监视的文件夹，可指定多个")
+    watch.add_argument("--out", dest="output", required=True, help="输出文件夹")
+    watch.add_argument("--workers", type=int, default=0, help="进程数，默认等于CPU核心数")
+    watch.add_argument("--interval", type=float, default=2.0, help="扫描间隔（秒）")
+    watch.add_argument("--settle", type=float, default=2.0, help="文件大小和修改时间保持不变多少秒后视为写入完成")
+    watch.add_argument("--once", action="store_true", help="处理完当前文件后退出（适合定时任务）")
+    watch.set_defaults(func=run_watch)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
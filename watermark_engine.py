@@ -0,0 +1,868 @@
+import io
+import os
+import functools
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageFilter, ExifTags
+
+from watermark_cache import LRUCache
+from watermark_fonts import get_font_index
+from watermark_trace import tracer
+from watermark_metadata import get_metadata_index, header_exif, exif_orientation
+
+# 渲染引擎 - 不依赖Qt，可在GUI之外（导出线程、子进程、命令行）使用
+
+CUSTOM_POSITION = "自定义拖拽"
+
+# 九宫格位置距图片边缘的距离（像素）
+EDGE_MARGIN = 10
+
+# 快速草图预览的代理图尺寸（相对显示尺寸）
+DRAFT_SCALE = 0.5
+
+# 未选中图片在内存中只保留的缩小预览图的最长边（像素）
+PREVIEW_PROXY_SIZE = 2048
+
+# 列表缩略图尺寸（像素）
+THUMBNAIL_SIZE = 80
+
+# 找不到指定字体时依次尝试的字体
+FALLBACK_FONTS = ["simhei.ttf", "msyh.ttc", "simsun.ttc"]
+
+# 默认共享设置
+DEFAULT_SHARED_SETTINGS = {
+    "type": "text",
+    "text": "水印",
+    "font_family": "Microsoft YaHei",
+    "font_size": 40,
+    "bold": False,
+    "italic": False,
+    "color": "#FFFFFF",
+    "opacity": 80,
+    "position": "右下角",
+    "rotation": 0,
+    "shadow": False,
+    "shadow_color": "#000000",
+    "shadow_offset": 2,
+    "shadow_blur": 2,
+    "outline": False,
+    "outline_color": "#000000",
+    "outline_width": 1,
+    "image_path": "",
+    "image_scale": 100,
+    "image_opacity": 80,
+    "output_format": "JPEG",
+    "quality": 90,
+    "resize_enabled": False,
+    "resize_mode": "percent",
+    "resize_width": 0,
+    "resize_height": 0,
+    "resize_percent": 100,
+    "keep_aspect": True,
+    "parallel_export": True,
+    "export_workers": 0,
+    "incremental_export": True,
+    "naming_prefix": "",
+    "naming_suffix": "_watermarked"
+}
+
+# 默认个性化设置
+DEFAULT_PER_IMAGE_SETTINGS = {
+    "type": "text",
+    "text": "",  # 为空时使用共享设置的文本
+    "font_family": "Microsoft YaHei",
+    "font_size": 40,
+    "bold": False,
+    "italic": False,
+    "color": "#FFFFFF",
+    "opacity": 80,
+    "rotation": 0,
+    "shadow": False,
+    "shadow_color": "#000000",
+    "shadow_offset": 2,
+    "shadow_blur": 2,
+    "outline": False,
+    "outline_color": "#000000",
+    "outline_width": 1,
+    "image_path": "",
+    "image_scale": 100,
+    "image_opacity": 80,
+    "offset_x": 0,
+    "offset_y": 0
+}
+
+
+def resolve_settings(shared_settings, per_image_settings=None):
+    """合并共享设置与个性化设置，得到单张图片渲染所需的有效设置"""
+    settings = DEFAULT_SHARED_SETTINGS.copy()
+    settings.update(shared_settings)
+    settings["offset_x"] = 0
+    settings["offset_y"] = 0
+    settings.setdefault("custom_drag", False)
+    settings.setdefault("preview_size", None)
+
+    if per_image_settings:
+        for key in DEFAULT_PER_IMAGE_SETTINGS:
+            if key in per_image_settings:
+                settings[key] = per_image_settings[key]
+        # 个性化文本为空时使用共享文本
+        if not per_image_settings.get("text", ""):
+            settings["text"] = shared_settings.get("text", DEFAULT_SHARED_SETTINGS["text"])
+
+    return settings
+
+
+class ImageOverrides:
+    """个性化设置：只保存与默认值不同的键
+
+    未保存的键读取时返回 DEFAULT_PER_IMAGE_SETTINGS 中的默认值。多张图片可以共用同一个
+    对象（group 为 True 的分组设置），修改其中一张图片前应先 copy()。
+    """
+    __slots__ = ("values", "group")
+
+    def __init__(self, values=None, group=False):
+        self.values = {}
+        self.group = group
+        if values:
+            self.update(values)
+
+    @property
+    def has_overrides(self):
+        return bool(self.values)
+
+    def get(self, key, default=None):
+        if key in self.values:
+            return self.values[key]
+        return DEFAULT_PER_IMAGE_SETTINGS.get(key, default)
+
+    def __getitem__(self, key):
+        if key in self.values:
+            return self.values[key]
+        return DEFAULT_PER_IMAGE_SETTINGS[key]
+
+    def __setitem__(self, key, value):
+        if key in DEFAULT_PER_IMAGE_SETTINGS and DEFAULT_PER_IMAGE_SETTINGS[key] == value:
+            self.values.pop(key, None)
+        else:
+            self.values[key] = value
+
+    def __contains__(self, key):
+        return key in self.values or key in DEFAULT_PER_IMAGE_SETTINGS
+
+    def update(self, settings):
+        for key, value in settings.items():
+            self[key] = value
+
+    def copy(self, group=False):
+        return ImageOverrides(self.values, group)
+
+    def to_dict(self):
+        """返回包含默认值的完整设置"""
+        settings = DEFAULT_PER_IMAGE_SETTINGS.copy()
+        settings.update(self.values)
+        return settings
+
+
+def parse_color(color, default):
+    """将 #RRGGBB 颜色解析为RGB元组"""
+    try:
+        if color.startswith('#'):
+            return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+    except Exception:
+        pass
+    return default
+
+
+def watermark_position(position, image_size, watermark_size, margin=EDGE_MARGIN):
+    """计算九宫格位置对应的水印左上角坐标"""
+    img_width, img_height = image_size
+    wm_width, wm_height = watermark_size
+    margin = int(margin)
+
+    if position == "左上角":
+        return margin, margin
+    elif position == "中上":
+        return (img_width - wm_width) // 2, margin
+    elif position == "右上角":
+        return img_width - wm_width - margin, margin
+    elif position == "左中":
+        return margin, (img_height - wm_height) // 2
+    elif position == "居中":
+        return (img_width - wm_width) // 2, (img_height - wm_height) // 2
+    elif position == "右中":
+        return img_width - wm_width - margin, (img_height - wm_height) // 2
+    elif position == "左下角":
+        return margin, img_height - wm_height - margin
+    elif position == "中下":
+        return (img_width - wm_width) // 2, img_height - wm_height - margin
+    else:
+        return img_width - wm_width - margin, img_height - wm_height - margin
+
+
+def output_filename(image_path, settings):
+    """根据命名规则生成输出文件名"""
+    name, ext = os.path.splitext(os.path.basename(image_path))
+    return f"{settings.get('naming_prefix', '')}{name}{settings.get('naming_suffix', '')}{ext}"
+
+
+# 影响文本图层外观的设置项（不含位置和偏移）
+TEXT_LAYER_KEYS = ("text", "font_family", "font_size", "bold", "italic", "color", "opacity",
+                   "shadow", "shadow_color", "shadow_offset", "outline", "outline_color",
+                   "outline_width", "rotation", "draft")
+
+
+def text_layer_key(settings):
+    """文本图层缓存键：只包含影响图层外观的设置"""
+    return tuple(settings.get(key) for key in TEXT_LAYER_KEYS)
+
+
+class TextLayer:
+    """渲染完成的文本水印图层及其排版尺寸"""
+
+    def __init__(self, font, text_width, text_height):
+        self.font = font
+        self.text_width = text_width
+        self.text_height = text_height
+        self.fill = (255, 255, 255)
+        self.image = None
+        self.margin = 0
+
+
+def shift_product(image, radius, horizontal, result=None):
+    """result 依次乘以 image 水平或垂直平移 ±1..±radius 像素后的副本（result 为None时从第一个副本开始）"""
+    for distance in range(1, radius + 1):
+        for offset in (distance, -distance):
+            shifted = Image.new('L', image.size, 255)
+            shifted.paste(image, (offset, 0) if horizontal else (0, offset))
+            result = shifted if result is None else ImageChops.multiply(result, shifted)
+    return result
+
+
+def dilate_mask(mask, radius, include_center=True):
+    """用 (2*radius+1) 的方形范围膨胀字形遮罩
+
+    效果等同于在方形范围内的每个偏移位置各绘制一次文字（include_center 为False时不含中心位置，
+    与描边只在四周绘制一致）：多次绘制叠加后的覆盖率为 1 - ∏(1 - c)，乘积可以先水平再垂直
+    分两步计算，因此只需约 4*radius 次整图运算，而不是 (2*radius+1)² 次文字光栅化。
+    """
+    bbox = mask.getbbox()
+    if radius <= 0 or bbox is None:
+        return mask
+
+    # 只处理字形外扩 radius 后的区域，图层中为旋转预留的空白边距不参与计算
+    box = (max(0, bbox[0] - radius), max(0, bbox[1] - radius),
+           min(mask.width, bbox[2] + radius), min(mask.height, bbox[3] + radius))
+
+    # 在“未覆盖率”上做乘法，最后再取反
+    uncovered = ImageChops.invert(mask.crop(box))
+    # 同一行的其它偏移位置，再乘上中心得到整行
+    row = shift_product(uncovered, radius, True)
+    full_row = ImageChops.multiply(row, uncovered)
+    # 其它行取整行；中心所在行按是否包含中心取整行或不含中心的部分
+    uncovered = shift_product(full_row, radius, False, full_row if include_center else row)
+
+    dilated = Image.new('L', mask.size, 0)
+    dilated.paste(ImageChops.invert(uncovered), box[:2])
+    return dilated
+
+
+def composite_region(image, overlay, position):
+    """将RGBA图层合成到图片的对应区域
+
+    只裁剪图层覆盖的区域进行合成再贴回原位，结果与先把图层粘贴到整幅透明图层、
+    再与整张图片 alpha_composite 相同，但内存和耗时只与图层大小有关。
+    """
+    x, y = position
+    left, top = max(0, x), max(0, y)
+    right = min(image.width, x + overlay.width)
+    bottom = min(image.height, y + overlay.height)
+    if right <= left or bottom <= top:
+        return image
+
+    region = image.crop((left, top, right, bottom)).convert('RGBA')
+    layer = Image.new('RGBA', region.size, (0, 0, 0, 0))
+    layer.paste(overlay, (x - left, y - top), overlay)
+    region = Image.alpha_composite(region, layer)
+    image.paste(region.convert(image.mode), (left, top))
+    return image
+
+
+class LogoLayer:
+    """处理完成的图片水印：缩放并应用透明度后的图片，以及旋转后的图片"""
+
+    def __init__(self, image):
+        self.image = image
+        self.rotated = None
+
+
+@functools.lru_cache(maxsize=101)
+def opacity_lut(opacity):
+    """透明度查找表：将alpha通道按百分比缩放"""
+    return [int(p * opacity / 100) for p in range(256)]
+
+
+def image_orientation(image):
+    """读取EXIF方向标记（只解析文件头中的EXIF），没有时返回1"""
+    try:
+        return exif_orientation(header_exif(image))
+    except Exception:
+        return 1
+
+
+# EXIF方向标记对应的转置操作（旋转90/270度时宽高互换）
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def apply_orientation(image, orientation):
+    """按EXIF方向标记旋转/翻转图片"""
+    method = ORIENTATION_TRANSPOSE.get(orientation)
+    return image.transpose(method) if method is not None else image
+
+
+def make_proxy(image, max_side=PREVIEW_PROXY_SIZE):
+    """缩小图片用于预览，并在 info 中记录原图尺寸"""
+    width, height = image.size
+    scale = min(1, max_side / max(width, height))
+    proxy_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    proxy = image.resize(proxy_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    proxy.info["source_size"] = image.info.get("source_size", image.size)
+    return proxy
+
+
+def source_size(image):
+    """图片对应的原图尺寸（缩小的预览图返回原图尺寸）"""
+    return image.info.get("source_size", image.size)
+
+
+def proxy_covers(image, max_size):
+    """缩小的预览图是否足以按 max_size 显示，不需要重新加载原图"""
+    width, height = source_size(image)
+    scale = min(max_size[0] / width, max_size[1] / height, 1)
+    return image.width >= int(width * scale) and image.height >= int(height * scale)
+
+
+def exif_thumbnail(image, size):
+    """读取JPEG EXIF中内嵌的缩略图
+
+    缩略图不小于目标尺寸且宽高比与原图一致（无黑边）时才使用，否则返回None。
+    """
+    try:
+        raw = image.info.get("exif")
+        if not raw:
+            return None
+        ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(0x0201)
+        length = ifd1.get(0x0202)
+        if not offset or not length:
+            return None
+
+        # 偏移量相对于TIFF头，APP1数据以"Exif\0\0"开头
+        start = offset + (6 if raw.startswith(b"Exif\x00\x00") else 0)
+        thumb = Image.open(io.BytesIO(raw[start:start + length]))
+        thumb.load()
+    except Exception:
+        return None
+
+    if max(thumb.size) < max(size):
+        return None
+    if abs(thumb.width / thumb.height - image.width / image.height) > 0.02:
+        return None
+    thumb.thumbnail(size, Image.Resampling.LANCZOS)
+    return thumb
+
+
+# 渲染缓存的显示名称
+CACHE_NAMES = {"text_layer": "文本图层", "font": "字体", "logo": "图片水印"}
+
+
+def format_cache_stats(stats):
+    """把 cache_stats() 的结果格式化为一行"""
+    return "；".join(f"{CACHE_NAMES.get(name, name)}: 命中 {values['hits']} 次，未命中 {values['misses']} 次"
+                    for name, values in stats.items())
+
+
+class WatermarkRenderer:
+    """根据普通的设置字典为图片添加水印，不读取任何界面控件"""
+
+    def __init__(self, text_layer_capacity=32, font_capacity=64, logo_capacity=16):
+        # 渲染完成的文本图层缓存，批量导出时相同设置只渲染一次
+        self.text_layer_cache = LRUCache(text_layer_capacity)
+        # 已加载的字体对象，键为 (路径, 字号, 索引)
+        self.font_cache = LRUCache(font_capacity)
+        # 处理完成的图片水印，批量导出时同一Logo只处理一次
+        self.logo_cache = LRUCache(logo_capacity)
+        # 字体族 -> 实际使用的字体文件（含后备字体查找结果）
+        self.font_sources = {}
+
+    def cache_stats(self):
+        """返回各缓存的命中统计"""
+        return {
+            "text_layer": self.text_layer_cache.stats(),
+            "font": self.font_cache.stats(),
+            "logo": self.logo_cache.stats()
+        }
+
+    def load_image(self, path):
+        """加载（解码）图片并修复方向，统一转换为RGB模式"""
+        with tracer.stage("decode") as stage:
+            image = Image.open(path)
+            # 方向从共享的元数据索引读取（与缩略图、预览和日期文本共用同一份缓存）
+            orientation = get_metadata_index().get(path, image).orientation
+            image.load()
+            stage.nbytes = os.path.getsize(path)
+        image = self.fix_image_orientation(image, orientation)
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return image
+
+    def load_thumbnail(self, path, size=(THUMBNAIL_SIZE, THUMBNAIL_SIZE)):
+        """生成列表缩略图（RGB），不解码完整尺寸的图片
+
+        优先使用JPEG EXIF中内嵌的缩略图；否则JPEG按DCT缩放解码，其它格式先整数倍缩小再重采样。
+        """
+        with Image.open(path) as image:
+            orientation = get_metadata_index().get(path, image).orientation
+            thumb = exif_thumbnail(image, size) if image.format == "JPEG" else None
+            if thumb is None:
+                image.draft("RGB", (size[0] * 2, size[1] * 2))
+                image.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+                thumb = image.convert("RGB")
+
+        thumb = apply_orientation(thumb, orientation)
+        if thumb.mode != 'RGB':
+            thumb = thumb.convert('RGB')
+        return thumb
+
+    def fix_image_orientation(self, image, orientation=None):
+        """修复图片方向（处理EXIF方向信息）；已知方向时直接传入，不再读取EXIF"""
+        try:
+            with tracer.stage("orientation"):
+                if orientation is None:
+                    orientation = image_orientation(image)
+                image = apply_orientation(image, orientation)
+        except Exception as e:
+            print(f"修复图片方向错误: {str(e)}")
+
+        return image
+
+    def output_size(self, size, settings):
+        """计算按导出设置调整后的图片尺寸（不实际缩放）"""
+        if not settings.get("resize_enabled", False):
+            return size
+
+        if settings.get("resize_mode", "percent") == "percent":
+            percent = settings.get("resize_percent", 100)
+            return int(size[0] * percent / 100), int(size[1] * percent / 100)
+
+        width = settings.get("resize_width", 0)
+        height = settings.get("resize_height", 0)
+        if width <= 0 or height <= 0:
+            return size
+
+        if settings.get("keep_aspect", True):
+            original_ratio = size[0] / size[1]
+            if width / height > original_ratio:
+                return int(height * original_ratio), height
+            return width, int(width / original_ratio)
+        return width, height
+
+    def resize_image(self, image, settings):
+        """按导出设置调整图片尺寸"""
+        new_size = self.output_size(image.size, settings)
+        if new_size == image.size:
+            return image
+        with tracer.stage("resize"):
+            return image.resize(new_size, Image.Resampling.LANCZOS)
+
+    def scale_settings(self, settings, factor):
+        """按比例缩放水印的像素参数，用于在缩小的图片上得到与导出一致的效果"""
+        scaled = dict(settings)
+        scaled["font_size"] = max(1, round(settings.get("font_size", 40) * factor))
+        if settings.get("outline_width", 1) > 0:
+            scaled["outline_width"] = max(1, round(settings.get("outline_width", 1) * factor))
+        scaled["shadow_offset"] = round(settings.get("shadow_offset", 2) * factor)
+        scaled["image_scale"] = settings.get("image_scale", 100) * factor
+        scaled["margin"] = settings.get("margin", EDGE_MARGIN) * factor
+
+        # 拖拽坐标按预览图尺寸换算，不需要再缩放
+        if not (settings.get("custom_drag") and settings.get("preview_size")):
+            scaled["offset_x"] = round(settings.get("offset_x", 0) * factor)
+            scaled["offset_y"] = round(settings.get("offset_y", 0) * factor)
+        return scaled
+
+    def render_preview(self, image, settings, max_size, draft=False):
+        """按显示尺寸渲染预览：先把图片缩小到显示尺寸，再按比例缩放水印参数
+
+        draft 为 True 时渲染快速草图：代理图更小、使用双线性插值，并跳过斜体和阴影模糊。
+        """
+        resample = Image.Resampling.LANCZOS
+        if draft:
+            settings = dict(settings, draft=True)
+            max_size = (max_size[0] * DRAFT_SCALE, max_size[1] * DRAFT_SCALE)
+            resample = Image.Resampling.BILINEAR
+
+        # image 可能是缩小的预览图，水印参数始终按原图尺寸换算
+        output_width, output_height = self.output_size(source_size(image), settings)
+        factor = min(max_size[0] / output_width, max_size[1] / output_height)
+        if factor >= 1 and image.size == source_size(image):
+            resized = self.resize_image(image, settings)
+            if resized is image:
+                return self.render(image, settings)
+            return self.draw_watermark(resized, settings)
+        factor = min(factor, 1)
+
+        # 缩小后的图片是新的缓冲区，直接在上面绘制水印
+        proxy_size = (max(1, int(output_width * factor)), max(1, int(output_height * factor)))
+        with tracer.stage("resize"):
+            proxy = image.resize(proxy_size, resample, reducing_gap=2.0)
+        return self.draw_watermark(proxy, self.scale_settings(settings, proxy_size[0] / output_width))
+
+    def render(self, image, settings):
+        """为图片添加水印，返回新的图片
+
+        传入的图片（例如缓存中共享的原图）不会被修改，只分配一个输出缓冲区。
+        """
+        result = image.copy() if image.mode == 'RGB' else image.convert('RGB')
+        return self.draw_watermark(result, settings)
+
+    def draw_watermark(self, image, settings):
+        """直接在图片上绘制水印（会修改传入的图片），用于调用方自己持有的图片"""
+        with tracer.stage("composite"):
+            if settings.get("type", "text") == "text":
+                return self.add_text_watermark(image, settings)
+            return self.add_image_watermark(image, settings)
+
+    def export_image(self, image_path, output_path, settings):
+        """加载、调整尺寸、添加水印并保存单张图片，返回输出文件路径"""
+        with tracer.image(image_path):
+            image = self.load_image(image_path)
+            image = self.resize_image(image, settings)
+            # 图片是本次加载的，不需要再复制
+            watermarked_image = self.draw_watermark(image, settings)
+
+            os.makedirs(output_path, exist_ok=True)
+            output_filepath = os.path.join(output_path, output_filename(image_path, settings))
+            self.save_image(watermarked_image, output_filepath, settings)
+            return output_filepath
+
+    def save_image(self, image, output_filepath, settings):
+        """按输出格式和质量保存图片
+
+        先在内存中编码，再写入同一文件夹中的临时文件，落盘后重命名为输出文件名，
+        中断时不会留下写了一半的输出。
+        """
+        format = settings.get("output_format", "JPEG")
+        with tracer.stage("encode") as stage:
+            buffer = io.BytesIO()
+            if format == "JPEG":
+                image.save(buffer, format, quality=settings.get("quality", 90), optimize=True)
+            else:
+                image.save(buffer, format, optimize=True)
+            data = buffer.getbuffer()
+            stage.nbytes = data.nbytes
+
+        directory, name = os.path.split(output_filepath)
+        temp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+        try:
+            with tracer.stage("write", data.nbytes):
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, output_filepath)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def resolve_position(self, settings, image_size, watermark_size):
+        """计算水印左上角坐标（包含偏移和自定义拖拽）"""
+        offset_x = settings.get("offset_x", 0)
+        offset_y = settings.get("offset_y", 0)
+
+        if settings.get("position") == CUSTOM_POSITION and settings.get("custom_drag"):
+            x, y = offset_x, offset_y
+
+            # 拖拽坐标基于预览图，需要换算到实际图片尺寸
+            preview_size = settings.get("preview_size")
+            if preview_size and preview_size[0] > 0 and preview_size[1] > 0:
+                x = int(x * image_size[0] / preview_size[0])
+                y = int(y * image_size[1] / preview_size[1])
+            return x, y
+
+        x, y = watermark_position(settings.get("position"), image_size, watermark_size,
+                                  settings.get("margin", EDGE_MARGIN))
+        return x + offset_x, y + offset_y
+
+    def get_font_path(self, font_family):
+        """通过字体索引查找字体文件"""
+        return get_font_index().find(font_family)
+
+    def resolve_font_source(self, font_family):
+        """确定字体族对应的字体文件，找不到时依次尝试常用中文字体，结果按字体族缓存"""
+        if font_family in self.font_sources:
+            return self.font_sources[font_family]
+
+        source = None
+        try:
+            source = self.get_font_path(font_family)
+        except Exception:
+            pass
+
+        if source is None:
+            for fallback_font in FALLBACK_FONTS:
+                try:
+                    ImageFont.truetype(fallback_font, 12)
+                    source = fallback_font
+                    break
+                except Exception:
+                    continue
+
+        self.font_sources[font_family] = source
+        return source
+
+    def load_font(self, font_family, font_size, index=0):
+        """加载字体（按路径、字号和索引缓存字体对象），最后使用默认字体"""
+        source = self.resolve_font_source(font_family)
+        if source is None:
+            return self.font_cache.get_or_create(None, ImageFont.load_default)
+
+        try:
+            return self.font_cache.get_or_create(
+                (source, font_size, index), lambda: ImageFont.truetype(source, font_size, index=index))
+        except Exception:
+            return self.font_cache.get_or_create(None, ImageFont.load_default)
+
+    def get_text_layer(self, settings):
+        """获取文本水印图层，相同文本和样式只渲染一次"""
+        def build():
+            with tracer.stage("layer"):
+                return self.build_text_layer(settings)
+
+        return self.text_layer_cache.get_or_create(text_layer_key(settings), build)
+
+    def build_text_layer(self, settings):
+        """渲染旋转后的文本水印图层（与图片内容和位置无关）"""
+        text = settings.get("text", "")
+        font_size = settings.get("font_size", 40)
+        bold = settings.get("bold", False)
+        italic = settings.get("italic", False)
+        opacity = settings.get("opacity", 80)
+        shadow = settings.get("shadow", False)
+        shadow_offset = settings.get("shadow_offset", 2)
+        outline = settings.get("outline", False)
+        outline_width = settings.get("outline_width", 1)
+        rotation = settings.get("rotation", 0)
+        draft = settings.get("draft", False)
+
+        font = self.load_font(settings.get("font_family", ""), font_size)
+
+        # 计算文本尺寸
+        temp_image = Image.new('RGB', (1, 1))
+        temp_draw = ImageDraw.Draw(temp_image)
+
+        try:
+            bbox = temp_draw.textbbox((0, 0), text, font=font)
+            text_width = bbox[2] - bbox[0]
+            text_height = bbox[3] - bbox[1]
+        except Exception:
+            # 如果textbbox不可用，使用估计值
+            text_width = len(text) * font_size // 2
+            text_height = font_size
+
+        # 如果计算出的尺寸为0，使用默认值
+        if text_width == 0 or text_height == 0:
+            text_width = 100
+            text_height = 50
+
+        layer = TextLayer(font, text_width, text_height)
+
+        # 获取颜色
+        rgb = parse_color(settings.get("color", "#FFFFFF"), (255, 255, 255))
+        shadow_rgb = parse_color(settings.get("shadow_color", "#000000"), (0, 0, 0))
+        outline_rgb = parse_color(settings.get("outline_color", "#000000"), (0, 0, 0))
+        alpha = int(255 * opacity / 100)
+        layer.fill = rgb
+
+        # 文字只光栅化一次得到字形遮罩，描边和粗体由遮罩膨胀得到
+        try:
+            # 创建足够大的文本图层（考虑旋转后的尺寸）
+            rotation_margin = int(max(text_width, text_height) * 0.5)
+            layer_size = (text_width + 2 * rotation_margin, text_height + 2 * rotation_margin)
+
+            # 在文本图层中心绘制字形遮罩
+            text_x = rotation_margin
+            text_y = rotation_margin
+            glyph_mask = Image.new('L', layer_size, 0)
+            ImageDraw.Draw(glyph_mask).text((text_x, text_y), text, font=font, fill=255)
+
+            text_layer = Image.new('RGBA', layer_size, (0, 0, 0, 0))
+
+            # 描边效果：字形向四周膨胀 outline_width 像素
+            if outline and outline_width > 0:
+                text_layer.paste(outline_rgb + (alpha,), None,
+                                 dilate_mask(glyph_mask, outline_width, include_center=False))
+
+            # 主文本，粗体时膨胀1像素模拟加粗
+            fill_mask = dilate_mask(glyph_mask, 1) if bold else glyph_mask
+            text_layer.paste(rgb + (alpha,), None, fill_mask)
+
+            if italic and not draft:
+                # 应用斜体变换
+                shear_factor = 0.2
+                text_layer = text_layer.transform(
+                    text_layer.size, Image.AFFINE,
+                    (1, shear_factor, 0, 0, 1, 0),
+                    resample=Image.BICUBIC, fill=(0, 0, 0, 0)
+                )
+
+            # 绘制阴影效果
+            if shadow:
+                shadow_mask = Image.new('L', layer_size, 0)
+                shadow_mask.paste(glyph_mask, (shadow_offset, shadow_offset))
+                shadow_layer = Image.new('RGBA', layer_size, (0, 0, 0, 0))
+                shadow_layer.paste(shadow_rgb + (alpha,), None, shadow_mask)
+
+                # 应用模糊效果
+                if not draft:
+                    shadow_layer = shadow_layer.filter(ImageFilter.GaussianBlur(radius=1))
+
+                # 合并阴影图层（放在文本下面）
+                text_layer = Image.alpha_composite(shadow_layer, text_layer)
+
+            # 应用旋转
+            if rotation != 0:
+                text_layer = text_layer.rotate(rotation, resample=Image.BILINEAR if draft else Image.BICUBIC,
+                                               expand=True)
+
+            layer.image = text_layer
+            layer.margin = rotation_margin
+        except Exception as e:
+            print(f"水印绘制错误: {str(e)}")
+
+        return layer
+
+    def add_text_watermark(self, image, settings):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        if not settings.get("text", ""):
+            return image
+
+        layer = self.get_text_layer(settings)
+        text_width, text_height = layer.text_width, layer.text_height
+
+        # 计算水印位置
+        img_width, img_height = image.size
+        x, y = self.resolve_position(settings, image.size, (text_width, text_height))
+
+        # 确保位置在图片范围内
+        x = max(0, min(x, img_width - text_width))
+        y = max(0, min(y, img_height - text_height))
+
+        try:
+            if layer.image is None:
+                raise Exception("文本图层渲染失败")
+
+            if settings.get("rotation", 0) != 0:
+                # 计算旋转后文本的位置（保持中心点不变）
+                rot_width, rot_height = layer.image.size
+                new_x = x + text_width // 2 - rot_width // 2
+                new_y = y + text_height // 2 - rot_height // 2
+            else:
+                new_x = x - layer.margin
+                new_y = y - layer.margin
+
+            # 将文本直接粘贴到原图（只修改文本覆盖的区域）
+            image.paste(layer.image, (new_x, new_y), layer.image)
+            result = image
+
+        except Exception as e:
+            print(f"水印绘制错误: {str(e)}")
+            # 如果复杂效果失败，使用简单绘制
+            draw = ImageDraw.Draw(image)
+            draw.text((x, y), settings.get("text", ""), font=layer.font, fill=layer.fill)
+            result = image
+
+        return result
+
+    def get_logo(self, watermark_path, scale, opacity, rotation, draft=False):
+        """获取缩放、透明度和旋转都已处理好的水印图片，按文件修改时间失效"""
+        key = (watermark_path, os.path.getmtime(watermark_path), scale, opacity, rotation, draft)
+
+        def build():
+            with tracer.stage("layer"):
+                return self.build_logo(watermark_path, scale, opacity, rotation, draft)
+
+        return self.logo_cache.get_or_create(key, build)
+
+    def build_logo(self, watermark_path, scale, opacity, rotation, draft=False):
+        """读取水印图片并处理为可直接粘贴的RGBA图层"""
+        with Image.open(watermark_path) as source:
+            # 确保水印图片是RGBA模式以支持透明度
+            watermark = source.convert('RGBA')
+
+        new_width = int(watermark.width * scale)
+        new_height = int(watermark.height * scale)
+        resample = Image.Resampling.BILINEAR if draft else Image.Resampling.LANCZOS
+        watermark = watermark.resize((new_width, new_height), resample)
+
+        # 应用透明度设置（查表）
+        if opacity < 100:
+            alpha = watermark.getchannel('A').point(opacity_lut(opacity))
+            watermark.putalpha(alpha)
+
+        logo = LogoLayer(watermark)
+        if rotation != 0:
+            logo.rotated = watermark.rotate(rotation, resample=Image.BILINEAR if draft else Image.BICUBIC,
+                                            expand=True)
+        return logo
+
+    def add_image_watermark(self, image, settings):
+        watermark_path = settings.get("image_path", "")
+        scale = settings.get("image_scale", 100) / 100.0
+        opacity = settings.get("image_opacity", 80)
+        rotation = settings.get("rotation", 0)
+
+        if not watermark_path or not os.path.exists(watermark_path):
+            return image
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        try:
+            logo = self.get_logo(watermark_path, scale, opacity, rotation, settings.get("draft", False))
+            watermark = logo.image
+
+            wm_width, wm_height = watermark.size
+            x, y = self.resolve_position(settings, image.size, watermark.size)
+
+            if rotation != 0:
+                # 计算旋转中心
+                center_x = x + wm_width // 2
+                center_y = y + wm_height // 2
+
+                # 计算旋转后的位置
+                rotated_watermark = logo.rotated
+                rotated_width, rotated_height = rotated_watermark.size
+                new_x = center_x - rotated_width // 2
+                new_y = center_y - rotated_height // 2
+
+                # 只在旋转后水印覆盖的区域内合成
+                return composite_region(image, rotated_watermark, (new_x, new_y))
+            else:
+                image.paste(watermark, (x, y), watermark)
+                return image
+
+        except Exception as e:
+            print(f"图片水印错误: {str(e)}")
+            return image
@@ -0,0 +1,276 @@
+import os
+import copy
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from watermark_engine import WatermarkRenderer, ImageOverrides, resolve_settings, output_filename
+from watermark_manifest import file_hash, settings_fingerprint
+from watermark_trace import tracer
+
+# 并行导出 - 在进程池中渲染和编码，不依赖Qt
+
+# 支持导入的图片格式
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif')
+
+# 每个子进程各自持有一个渲染器和任务快照，跨图片复用
+_renderer = None
+_job = None
+
+
+class ExportJob:
+    """导出任务快照
+
+    在导出开始时冻结共享设置、各图片的个性化设置（只包含与默认值不同的键）和输出选项，
+    创建后不可修改。subfolders 记录需要输出到输出文件夹中子文件夹的图片（见 source_subfolders）。
+    导出线程和子进程只根据快照渲染，不再访问界面状态；快照可转换为JSON字典，
+    每个子进程只需接收一次。
+    """
+    __slots__ = ("images", "output_path", "shared_settings", "overrides", "subfolders")
+
+    def __init__(self, images, output_path, shared_settings, overrides=None, subfolders=None):
+        object.__setattr__(self, "images", tuple(images))
+        object.__setattr__(self, "output_path", output_path)
+        object.__setattr__(self, "shared_settings", copy.deepcopy(dict(shared_settings)))
+        object.__setattr__(self, "overrides", copy.deepcopy(dict(overrides or {})))
+        object.__setattr__(self, "subfolders", dict(subfolders or {}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ExportJob 创建后不可修改")
+
+    def __reduce__(self):
+        return ExportJob.from_dict, (self.to_dict(),)
+
+    def __len__(self):
+        return len(self.images)
+
+    def settings_for(self, image_path):
+        """返回指定图片的有效设置（每次返回新的字典）"""
+        per_image = self.overrides.get(image_path)
+        return resolve_settings(self.shared_settings, ImageOverrides(per_image) if per_image is not None else None)
+
+    def output_folder(self, image_path):
+        """图片的输出文件夹"""
+        subfolder = self.subfolders.get(image_path)
+        return os.path.join(self.output_path, subfolder) if subfolder else self.output_path
+
+    def output_name(self, image_path, settings):
+        """输出文件相对于输出文件夹的路径"""
+        subfolder = self.subfolders.get(image_path)
+        name = output_filename(image_path, settings)
+        return os.path.join(subfolder, name) if subfolder else name
+
+    def output_filepaths(self):
+        """所有图片的输出文件路径"""
+        return [os.path.join(self.output_path, self.output_name(path, self.settings_for(path)))
+                for path in self.images]
+
+    def with_images(self, images):
+        """返回只包含指定图片、其余设置相同的新快照"""
+        return ExportJob(images, self.output_path, self.shared_settings,
+                         {path: self.overrides[path] for path in images if path in self.overrides},
+                         {path: self.subfolders[path] for path in images if path in self.subfolders})
+
+    def to_dict(self):
+        return {
+            "images": list(self.images),
+            "output_path": self.output_path,
+            "shared_settings": copy.deepcopy(self.shared_settings),
+            "overrides": copy.deepcopy(self.overrides),
+            "subfolders": dict(self.subfolders)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["images"], data["output_path"], data["shared_settings"], data.get("overrides"),
+                   data.get("subfolders"))
+
+
+def source_subfolders(images, folders):
+    """返回 {图片路径: 相对于所在输入文件夹的子文件夹}，导出时在输出文件夹中保持输入的文件夹结构
+
+    输入文件夹顶层的图片不包含在内。有多个输入文件夹时子文件夹前再加上输入文件夹的名称，
+    不同文件夹中的同名图片不会输出到同一位置。
+    """
+    folders = [os.path.abspath(folder) for folder in folders]
+    subfolders = {}
+    for image_path in images:
+        directory = os.path.dirname(os.path.abspath(image_path))
+        for folder in folders:
+            try:
+                relative = os.path.relpath(directory, folder)
+            except ValueError:
+                # Windows 上位于不同驱动器
+                continue
+            if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+                continue
+            if len(folders) > 1:
+                relative = os.path.join(os.path.basename(folder), relative)
+            relative = os.path.normpath(relative)
+            if relative != os.curdir:
+                subfolders[image_path] = relative
+            break
+    return subfolders
+
+
+def default_worker_count():
+    """默认进程数：CPU核心数"""
+    return os.cpu_count() or 1
+
+
+def export_image(renderer, job, image_path):
+    """按快照导出单张图片，返回输出文件路径"""
+    try:
+        return renderer.export_image(image_path, job.output_folder(image_path), job.settings_for(image_path))
+    except Exception as e:
+        raise Exception(f"处理图片 {os.path.basename(image_path)} 时出错: {str(e)}")
+
+
+def plan_incremental_export(job, manifest, full=False):
+    """对照导出清单，返回 (只包含需要重新导出图片的新快照, 跳过的数量, 各图片的设置指纹)
+
+    没有个性化设置的图片共用同一个指纹，个性化设置相同的图片也只计算一次。
+    full 为 True 时不跳过任何图片，只计算指纹。
+    多张图片的输出文件相同（例如不同文件夹中的同名图片）时抛出 ValueError，不会互相覆盖。
+    """
+    fingerprints = {}
+    shared_settings = resolve_settings(job.shared_settings)
+    shared_fingerprint = settings_fingerprint(shared_settings)
+    by_overrides = {}
+    outputs = {}
+    stale = []
+
+    for image_path in job.images:
+        per_image = job.overrides.get(image_path)
+        if per_image is None:
+            settings, fingerprint = shared_settings, shared_fingerprint
+        else:
+            key = json.dumps(per_image, sort_keys=True, ensure_ascii=False, default=str)
+            if key not in by_overrides:
+                settings = job.settings_for(image_path)
+                by_overrides[key] = (settings, settings_fingerprint(settings))
+            settings, fingerprint = by_overrides[key]
+
+        output_name = job.output_name(image_path, settings)
+        other = outputs.setdefault(os.path.normcase(output_name), image_path)
+        if other != image_path:
+            raise ValueError(f"{other} 和 {image_path} 的输出文件相同: {output_name}")
+
+        fingerprints[image_path] = fingerprint
+        if full or not manifest.is_current(image_path, output_name, fingerprint):
+            stale.append(image_path)
+
+    return job.with_images(stale), len(job.images) - len(stale), fingerprints
+
+
+def recover_journal(journal, manifest):
+    """把上次未完成的导出中已完成的图片写入导出清单
+
+    返回 (上次的任务快照, 已完成的图片集合)；没有未完成的导出时返回 (None, 空集合)。
+    """
+    job_data, completed = journal.load()
+    if job_data is None:
+        return None, set()
+    for record in completed:
+        manifest.add_entry(record["output"], record["entry"])
+    return ExportJob.from_dict(job_data), {record["image"] for record in completed}
+
+
+def init_worker(job_data, trace=False):
+    """子进程初始化：接收一次任务快照，并与主进程保持相同的计时开关"""
+    global _renderer, _job
+    _renderer = WatermarkRenderer()
+    _job = ExportJob.from_dict(job_data)
+    tracer.enable(trace)
+
+
+def export_task(image_path):
+    """子进程入口：导出单张图片
+
+    返回 (输出文件路径, 源文件哈希, 计时事件, (进程号, 渲染缓存统计))，哈希供导出清单使用。
+    """
+    output_filepath = export_image(_renderer, _job, image_path)
+    return (output_filepath, file_hash(image_path), tracer.drain() if tracer.enabled else [],
+            (os.getpid(), _renderer.cache_stats()))
+
+
+def merge_cache_stats(stats_list):
+    """合并多个渲染器（各子进程）的 cache_stats()，计数相加"""
+    merged = {}
+    for stats in stats_list:
+        for name, values in stats.items():
+            total = merged.setdefault(name, {"hits": 0, "misses": 0, "evictions": 0, "size": 0})
+            for key in total:
+                total[key] += values.get(key, 0)
+    return merged
+
+
+def run_parallel_export(job, workers=0, on_result=None, is_canceled=None, worker_stats=None):
+    """在进程池中导出任务快照中的所有图片
+
+    每完成一张图片（按完成顺序，而非提交顺序）调用 on_result(image_path, error, result)，
+    成功时 error 为 None，result 为 (输出文件路径, 源文件哈希)；失败时 result 为 None。
+    每个进程同时只分配一张图片，取消后最多再等待每个进程完成当前图片。返回已完成的图片数量。
+    子进程异常退出（例如被系统杀掉）时，正在处理的图片都按失败回调，之后抛出 BrokenProcessPool，
+    尚未提交的图片不会回调。
+    传入字典 worker_stats 时，记录每个子进程最新的渲染缓存统计 {进程号: cache_stats()}。
+    """
+    if not job.images:
+        return 0
+
+    workers = workers or default_worker_count()
+    workers = max(1, min(workers, len(job.images)))
+
+    remaining = iter(job.images)
+    pending = {}
+    completed = 0
+    broken = False
+
+    # 使用 spawn 启动子进程：fork 会复制主进程中其它线程持有的锁（字体索引、缓存等），子进程可能卡死
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker, initargs=(job.to_dict(), tracer.enabled)) as executor:
+        def submit_next():
+            nonlocal broken
+            image_path = None if broken else next(remaining, None)
+            if image_path is None:
+                return
+            try:
+                pending[executor.submit(export_task, image_path)] = image_path
+            except BrokenProcessPool:
+                # 不再提交，等待已提交的图片全部返回错误
+                broken = True
+
+        for _ in range(workers):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                image_path = pending.pop(future)
+                try:
+                    output_filepath, source_hash, events, (pid, cache_stats) = future.result()
+                    # 子进程的计时事件合并到主进程
+                    tracer.extend(events)
+                    if worker_stats is not None:
+                        worker_stats[pid] = cache_stats
+                    result = output_filepath, source_hash
+                    error = None
+                except BrokenProcessPool as e:
+                    broken = True
+                    result = None
+                    error = str(e)
+                except Exception as e:
+                    result = None
+                    error = str(e)
+
+                completed += 1
+                if on_result:
+                    on_result(image_path, error, result)
+
+                if not (is_canceled and is_canceled()):
+                    submit_next()
+
+    if broken:
+        raise BrokenProcessPool("导出子进程异常退出")
+    return completed
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import threading
+from PIL import ImageFont
+
+# 字体索引 - 递归扫描系统字体目录一次并保存到磁盘，按目录修改时间判断是否需要重建
+
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+FONT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".watermark_font_index.json")
+FONT_INDEX_VERSION = 1
+REGULAR_STYLES = ("regular", "normal", "book", "roman")
+
+
+def font_directories():
+    """返回当前平台的系统字体目录"""
+    if sys.platform == "win32":
+        return [
+            os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+            os.path.join(os.environ.get('SYSTEMROOT', 'C:\\Windows'), 'Fonts'),
+            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'Fonts')
+        ]
+    elif sys.platform == "darwin":
+        return [
+            '/Library/Fonts',
+            '/System/Library/Fonts',
+            os.path.expanduser('~/Library/Fonts')
+        ]
+    else:
+        return [
+            '/usr/share/fonts',
+            '/usr/local/share/fonts',
+            os.path.expanduser('~/.fonts'),
+            os.path.expanduser('~/.local/share/fonts')
+        ]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class FontIndex:
+    """系统字体索引：字体族、样式和文件路径
+
+    索引保存在磁盘上，记录扫描过的每个目录的修改时间；加载时只需对这些目录做一次
+    stat，目录未变化时不会重新扫描。查找为字典查询。
+    """
+
+    def __init__(self, index_path=FONT_INDEX_PATH, directories=None):
+        self.index_path = index_path
+        self.directories = list(directories) if directories is not None else font_directories()
+        self.fonts = []
+        self.dir_mtimes = {}
+        self.by_family = {}
+        self.by_style = {}
+        self.by_stem = {}
+        self.lookup_cache = {}
+        self.loaded_from_disk = False
+
+    def load(self):
+        """从磁盘加载索引，过期或不存在时重新扫描并保存"""
+        data = None
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if data and not self.is_stale(data):
+            self.fonts = data["fonts"]
+            self.dir_mtimes = data["dir_mtimes"]
+            self.loaded_from_disk = True
+        else:
+            self.build()
+            self.save()
+
+        self.build_lookup()
+        return self
+
+    def is_stale(self, data):
+        """索引版本、字体目录或任一目录修改时间变化时视为过期"""
+        if data.get("version") != FONT_INDEX_VERSION or data.get("directories") != self.directories:
+            return True
+        for directory, mtime in data.get("dir_mtimes", {}).items():
+            if _mtime(directory) != mtime:
+                return True
+        return False
+
+    def build(self):
+        """递归扫描所有字体目录"""
+        self.fonts = []
+        self.dir_mtimes = {}
+        seen = set()
+
+        for font_dir in self.directories:
+            # 不存在的目录也记录下来，创建后会触发重建
+            self.dir_mtimes[font_dir] = _mtime(font_dir)
+            if not os.path.isdir(font_dir):
+                continue
+
+            for root, dirs, files in os.walk(font_dir):
+                self.dir_mtimes[root] = _mtime(root)
+                for file in sorted(files):
+                    if not file.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, file)
+                    real_path = os.path.realpath(path)
+                    if real_path in seen:
+                        continue
+                    seen.add(real_path)
+
+                    family, style = None, None
+                    try:
+                        family, style = ImageFont.truetype(path, 12).getname()
+                    except Exception:
+                        pass
+                    self.fonts.append({"path": path, "family": family, "style": style})
+
+    def save(self):
+        data = {
+            "version": FONT_INDEX_VERSION,
+            "directories": self.directories,
+            "dir_mtimes": self.dir_mtimes,
+            "fonts": self.fonts
+        }
+        # 每个进程使用各自的临时文件，多个进程同时重建索引时不会互相覆盖
+        folder, name = os.path.split(self.index_path)
+        temp_path = os.path.join(folder, f".{name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"保存字体索引错误: {str(e)}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def build_lookup(self):
+        """建立查找表：字体族名、(字体族, 样式) 和文件名"""
+        self.by_family = {}
+        self.by_style = {}
+        self.by_stem = {}
+        self.lookup_cache = {}
+
+        regular_families = set()
+        for font in self.fonts:
+            path = font["path"]
+            family = (font.get("family") or "").lower()
+            style = (font.get("style") or "").lower()
+            if family:
+                self.by_style.setdefault((family, style), path)
+                # 同一字体族优先使用常规样式
+                if style in REGULAR_STYLES and family not in regular_families:
+                    regular_families.add(family)
+                    self.by_family[family] = path
+                else:
+                    self.by_family.setdefault(family, path)
+            stem = os.path.splitext(os.path.basename(path))[0].lower()
+            self.by_stem.setdefault(stem, path)
+
+    def find(self, font_family, style=None):
+        """查找字体文件路径，找不到时返回None"""
+        key = (font_family.lower(), (style or "").lower())
+        if key in self.lookup_cache:
+            return self.lookup_cache[key]
+
+        family = key[0]
+        path = None
+        if style:
+            path = self.by_style.get(key)
+        if path is None:
+            path = self.by_family.get(family) or self.by_stem.get(family)
+        if path is None and family:
+            # 兼容旧的匹配方式：文件名包含字体名
+            for font in self.fonts:
+                if family in os.path.basename(font["path"]).lower():
+                    path = font["path"]
+                    break
+
+        self.lookup_cache[key] = path
+        return path
+
+
+_font_index = None
+_font_index_lock = threading.Lock()
+
+
+def get_font_index():
+    """返回进程内共享的字体索引（首次调用时加载）"""
+    global _font_index
+    with _font_index_lock:
+        if _font_index is None:
+            _font_index = FontIndex().load()
+        return _font_index
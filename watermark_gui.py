@@ -0,0 +1,2467 @@
+import os
+import sys
+import json
+import threading
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from watermark_engine import (WatermarkRenderer, DEFAULT_SHARED_SETTINGS, DEFAULT_PER_IMAGE_SETTINGS,
+                              CUSTOM_POSITION, THUMBNAIL_SIZE, resolve_settings, make_proxy, proxy_covers,
+                              PREVIEW_PROXY_SIZE, ImageOverrides, format_cache_stats)
+from watermark_cache import LRUCache, image_nbytes
+from watermark_export import (ExportJob, export_image, run_parallel_export, default_worker_count,
+                              plan_incremental_export, recover_journal, IMAGE_EXTENSIONS)
+from watermark_manifest import ExportManifest, ExportJournal, ExportRecorder
+from watermark_thumbnails import ThumbnailStore
+from watermark_trace import tracer, summarize, format_summary, TRACE_ENV
+from watermark_metadata import get_metadata_index
+
+# 图形界面 - 由 main.py 启动；命令行批处理和导出子进程都不会导入本模块
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+                             QLabel, QPushButton, QListWidget, QListView, QTabWidget,
+                             QGroupBox, QComboBox, QSpinBox, QSlider, QLineEdit, QColorDialog,
+                             QFileDialog, QCheckBox, QMessageBox, QGridLayout, QSplitter,
+                             QScrollArea, QFrame, QDoubleSpinBox, QProgressBar, QInputDialog,
+                             QProgressDialog, QToolButton, QSizePolicy, QRadioButton, QButtonGroup,
+                             QStackedWidget)
+from PyQt5.QtCore import Qt, QSize, pyqtSignal, QThread, pyqtSlot, QPoint, QTimer, QObject, \
+    QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QPixmap, QIcon, QPalette, QColor, QFont, QPainter, QDragEnterEvent, QDropEvent, QFontDatabase, \
+    QImage
+
+# 应用样式表 - 优化版
+APP_STYLESHEET = """
+/* 主窗口样式 */
+QMainWindow {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1,
+                                stop: 0 #f8f9fa, stop: 1 #e9ecef);
+    font-family: "Microsoft YaHei", "Segoe UI", sans-serif;
+    font-size: 14px;
+}
+
+/* 卡片化效果 */
+QGroupBox {
+    background: rgba(255, 255, 255, 0.85);
+    border: 1px solid rgba(255, 255, 255, 0.4);
+    border-radius: 12px;
+    margin-top: 10px;
+    padding-top: 12px;
+    font-weight: bold;
+    color: #2c3e50;
+    font-size: 14px;
+}
+
+QGroupBox::title {
+    subcontrol-origin: margin;
+    subcontrol-position: top center;
+    padding: 4px 12px;
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+                                stop: 0 #7b68ee, stop: 1 #5f9ea0);
+    color: white;
+    border-radius: 8px;
+    font-size: 14px;
+}
+
+/* 玻璃化效果 */
+QFrame#preview_frame {
+    background: rgba(255, 255, 255, 0.25);
+    border: 1px solid rgba(255, 255, 255, 0.4);
+    border-radius: 12px;
+    backdrop-filter: blur(10px);
+}
+
+/* 按钮样式 - 更柔和的颜色 */
+QPushButton {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+                                stop: 0 #7b68ee, stop: 1 #5f9ea0);
+    border: none;
+    border-radius: 8px;
+    color: white;
+    padding: 10px 18px;
+    font-weight: bold;
+    margin: 3px;
+    font-size: 14px;
+    min-height: 20px;
+}
+
+QPushButton:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+                                stop: 0 #6a5acd, stop: 1 #4682b4);
+}
+
+QPushButton:pressed {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+                                stop: 0 #5d4ac1, stop: 1 #3a6a8c);
+}
+
+/* 列表样式 */
+QListView {
+    background: rgba(255, 255, 255, 0.75);
+    border: 1px solid rgba(255, 255, 255, 0.4);
+    border-radius: 8px;
+    outline: none;
+    font-size: 14px;
+}
+
+QListView::item {
+    padding: 10px;
+    border-bottom: 1px solid rgba(0, 0, 0, 0.1);
+    font-size: 14px;
+}
+
+QListView::item:selected {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+                                stop: 0 #7b68ee, stop: 1 #5f9ea0);
+    color: white;
+    border-radius: 6px;
+}
+
+/* 标签页样式 */
+QTabWidget::pane {
+    border: 1px solid rgba(255, 255, 255, 0.4);
+    border-radius: 8px;
+    background: rgba(255, 255, 255, 0.75);
+}
+
+QTabBar::tab {
+    background: rgba(255, 255, 255, 0.6);
+    border: 1px solid rgba(255, 255, 255, 0.4);
+    border-bottom: none;
+    border-top-left-radius: 8px;
+    border-top-right-radius: 8px;
+    padding: 10px 18px;
+    margin-right: 2px;
+    font-size: 14px;
+}
+
+QTabBar::tab:selected {
+    background: rgba(255, 255, 255, 0.95);
+    border-color: rgba(255, 255, 255, 0.6);
+}
+
+/* 输入框样式 */
+QLineEdit, QSpinBox, QComboBox {
+    background: rgba(255, 255, 255, 0.85);
+    border: 1px solid rgba(255, 255, 255, 0.6);
+    border-radius: 6px;
+    padding: 8px;
+    selection-background-color: #7b68ee;
+    font-size: 14px;
+    min-height: 20px;
+}
+
+QComboBox::drop-down {
+    border: none;
+    width: 25px;
+}
+
+QComboBox::down-arrow {
+    image: none;
+    border-left: 6px solid transparent;
+    border-right: 6px solid transparent;
+    border-top: 6px solid #2c3e50;
+    width: 0;
+    height: 0;
+}
+
+/* 滑动条样式 */
+QSlider::groove:horizontal {
+    border: 1px solid rgba(255, 255, 255, 0.4);
+    height: 8px;
+    background: rgba(255, 255, 255, 0.6);
+    border-radius: 4px;
+}
+
+QSlider::handle:horizontal {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                                stop:0 #7b68ee, stop:1 #5f9ea0);
+    border: 1px solid rgba(255, 255, 255, 0.6);
+    width: 20px;
+    margin: -8px 0;
+    border-radius: 10px;
+}
+
+/* 复选框样式 */
+QCheckBox {
+    spacing: 8px;
+    font-size: 14px;
+}
+
+QCheckBox::indicator {
+    width: 20px;
+    height: 20px;
+    border: 1px solid rgba(255, 255, 255, 0.6);
+    border-radius: 4px;
+    background: rgba(255, 255, 255, 0.8);
+}
+
+QCheckBox::indicator:checked {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                                stop:0 #7b68ee, stop:1 #5f9ea0);
+    border: 1px solid rgba(255, 255, 255, 0.6);
+}
+
+QCheckBox::indicator:checked::image {
+    width: 16px;
+    height: 16px;
+    image: url('data:image/svg+xml;utf8,<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="white" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"><polyline points="20 6 9 17 4 12"></polyline></svg>');
+}
+
+/* 单选按钮样式 */
+QRadioButton {
+    spacing: 8px;
+    font-size: 14px;
+}
+
+QRadioButton::indicator {
+    width: 20px;
+    height: 20px;
+    border: 1px solid rgba(255, 255, 255, 0.6);
+    border-radius: 10px;
+    background: rgba(255, 255, 255, 0.8);
+}
+
+QRadioButton::indicator:checked {
+    border: 6px solid #7b68ee;
+    background: white;
+}
+
+/* 进度条样式 */
+QProgressBar {
+    border: 1px solid rgba(255, 255, 255, 0.4);
+    border-radius: 5px;
+    text-align: center;
+    background: rgba(255, 255, 255, 0.6);
+    font-size: 14px;
+}
+
+QProgressBar::chunk {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                stop:0 #7b68ee, stop:1 #5f9ea0);
+    border-radius: 4px;
+}
+
+/* 滚动区域样式 */
+QScrollArea {
+    border: none;
+    background: transparent;
+}
+
+QScrollBar:vertical {
+    border: none;
+    background: rgba(255, 255, 255, 0.4);
+    width: 12px;
+    margin: 0px;
+    border-radius: 6px;
+}
+
+QScrollBar::handle:vertical {
+    background: rgba(123, 104, 238, 0.7);
+    border-radius: 6px;
+    min-height: 25px;
+}
+
+QScrollBar::handle:vertical:hover {
+    background: rgba(123, 104, 238, 0.9);
+}
+
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    border: none;
+    background: none;
+}
+
+/* 标签样式 */
+QLabel {
+    color: #2c3e50;
+    font-size: 14px;
+}
+
+QLabel#title_label {
+    font-size: 18px;
+    font-weight: bold;
+    color: #2c3e50;
+    padding: 12px;
+    background: rgba(255, 255, 255, 0.8);
+    border-radius: 10px;
+    margin: 6px;
+}
+"""
+
+
+class WatermarkThread(QThread):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, job, recorder=None):
+        super().__init__()
+        self.job = job
+        self.recorder = recorder
+        self.renderer = WatermarkRenderer()
+        self.canceled = False
+        self.interrupted = False
+        self.exported_count = 0
+
+    def run(self):
+        for i, image_path in enumerate(self.job.images):
+            if self.canceled:
+                break
+            try:
+                output_filepath = export_image(self.renderer, self.job, image_path)
+                self.exported_count += 1
+                if self.recorder is not None:
+                    self.recorder.record(image_path, output_filepath)
+            except Exception as e:
+                self.error.emit(f"导出图片 {os.path.basename(image_path)} 失败: {str(e)}")
+            self.progress.emit(i + 1)
+        if self.recorder is not None:
+            self.recorder.close(finished=not self.canceled)
+        self.finished.emit()
+
+    def cancel(self):
+        self.canceled = True
+
+
+class ParallelWatermarkThread(QThread):
+    """使用进程池并行导出，进度和错误按完成顺序上报"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, job, workers=0, recorder=None):
+        super().__init__()
+        self.job = job
+        self.workers = workers
+        self.recorder = recorder
+        self.canceled = False
+        self.interrupted = False
+        self.done_count = 0
+        self.exported_count = 0
+
+    def run(self):
+        # 只有正常完成（未取消）时才删除导出日志；进程池异常时保留日志，之后可以继续
+        finished = False
+        try:
+            run_parallel_export(self.job, self.workers, self.on_result, lambda: self.canceled)
+            finished = not self.canceled
+        except Exception as e:
+            self.interrupted = True
+            self.error.emit(f"并行导出失败: {str(e)}")
+        if self.recorder is not None:
+            self.recorder.close(finished)
+        self.finished.emit()
+
+    def on_result(self, image_path, error, result):
+        if error:
+            self.error.emit(f"导出图片 {os.path.basename(image_path)} 失败: {error}")
+        else:
+            self.exported_count += 1
+            if self.recorder is not None:
+                self.recorder.record(image_path, *result)
+        self.done_count += 1
+        self.progress.emit(self.done_count)
+
+    def cancel(self):
+        self.canceled = True
+
+
+class PreviewWorker(QThread):
+    """后台渲染预览：只保留最新的请求，过期的请求直接丢弃"""
+    rendered = pyqtSignal(int, QImage, bool)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self.condition = threading.Condition()
+        self.request = None
+        self.generation = 0
+        self.stopped = False
+
+    def submit(self, image_path, settings, max_size, draft=False):
+        """提交预览请求，覆盖尚未开始的旧请求，返回请求编号"""
+        with self.condition:
+            self.generation += 1
+            self.request = (self.generation, image_path, settings, max_size, draft)
+            self.condition.notify()
+            return self.generation
+
+    def is_stale(self, generation):
+        return generation != self.generation
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.request is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                generation, image_path, settings, max_size, draft = self.request
+                self.request = None
+
+            try:
+                with tracer.image(image_path, "preview"):
+                    image = self.app.load_and_fix_image(image_path, max_size)
+                    if image is None:
+                        self.failed.emit(generation, "无法加载图片")
+                        continue
+
+                    # 每个耗时步骤之后检查是否已有更新的请求
+                    if self.is_stale(generation):
+                        continue
+                    watermarked_image = self.app.renderer.render_preview(image, settings, max_size, draft)
+                if self.is_stale(generation):
+                    continue
+
+                data = watermarked_image.tobytes("raw", "RGB")
+                qimage = QImage(data, watermarked_image.size[0], watermarked_image.size[1],
+                                watermarked_image.size[0] * 3, QImage.Format_RGB888).copy()
+                self.rendered.emit(generation, qimage, draft)
+            except Exception as e:
+                print(f"预览更新错误: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                self.failed.emit(generation, f"预览错误: {str(e)}")
+
+
+class ThumbnailLoader(QObject):
+    """在线程池中生成列表缩略图（优先读取磁盘缓存），完成后通过信号交给界面线程"""
+    loaded = pyqtSignal(str, QImage)
+
+    def __init__(self, renderer, workers=0, max_pending=256):
+        super().__init__()
+        self.renderer = renderer
+        self.store = ThumbnailStore()
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(8, default_worker_count()))
+        self.max_pending = max_pending
+        self.futures = OrderedDict()
+        self.lock = threading.Lock()
+
+    def request(self, path):
+        """请求生成缩略图；排队中的不重复提交，排队过多时取消最早的请求（通常已滚出可见区域）"""
+        with self.lock:
+            if path in self.futures:
+                return
+            self.futures[path] = self.executor.submit(self.load, path)
+            while len(self.futures) > self.max_pending:
+                _, future = self.futures.popitem(last=False)
+                future.cancel()
+
+    def load(self, path):
+        try:
+            thumb = self.store.get_or_create(path, THUMBNAIL_SIZE, lambda: self.renderer.load_thumbnail(path))
+            data = thumb.tobytes("raw", "RGB")
+            qimage = QImage(data, thumb.size[0], thumb.size[1], thumb.size[0] * 3, QImage.Format_RGB888).copy()
+            self.loaded.emit(path, qimage)
+        except Exception as e:
+            print(f"创建缩略图错误: {str(e)}")
+        finally:
+            with self.lock:
+                self.futures.pop(path, None)
+
+    def cancel_all(self):
+        """取消尚未开始的缩略图任务"""
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+            self.futures.clear()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=True)
+        self.store.close()
+
+
+class ImageListModel(QAbstractListModel):
+    """图片列表模型
+
+    按路径建立行号索引用于去重；只在视图请求某一行的图标（即该行可见）时才生成缩略图，
+    已生成的图标按数量限制缓存。
+    """
+
+    def __init__(self, paths, thumbnail_loader, placeholder_icon, icon_capacity=2000):
+        super().__init__()
+        self.paths = paths
+        self.rows = {}
+        self.thumbnail_loader = thumbnail_loader
+        self.placeholder_icon = placeholder_icon
+        self.icons = LRUCache(icon_capacity)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        path = self.paths[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.DecorationRole:
+            icon = self.icons.get(path)
+            if icon is None:
+                self.thumbnail_loader.request(path)
+                return self.placeholder_icon
+            return icon
+        if role == Qt.ToolTipRole:
+            return path
+        return None
+
+    def add_paths(self, paths):
+        """批量追加图片（跳过已有的路径），返回新增的路径"""
+        first = len(self.paths)
+        new_paths = []
+        for path in paths:
+            if path not in self.rows:
+                self.rows[path] = first + len(new_paths)
+                new_paths.append(path)
+
+        if new_paths:
+            self.beginInsertRows(QModelIndex(), first, first + len(new_paths) - 1)
+            self.paths.extend(new_paths)
+            self.endInsertRows()
+        return new_paths
+
+    def set_thumbnail(self, path, icon):
+        """保存生成好的图标，返回对应行的索引（图片已不在列表中时返回None）
+
+        图标尺寸固定，不发送 dataChanged（QListView 收到后会重新布局所有行），
+        由视图重绘该行即可。
+        """
+        row = self.rows.get(path)
+        if row is None:
+            return None
+        self.icons.put(path, icon)
+        return self.index(row)
+
+    def clear(self):
+        self.beginResetModel()
+        self.paths.clear()
+        self.rows.clear()
+        self.icons.clear()
+        self.endResetModel()
+
+
+class DraggableLabel(QLabel):
+    positionChanged = pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet(
+            "background-color: rgba(255, 255, 255, 0.7); border: 2px dashed #7b68ee; border-radius: 8px; font-size: 14px;")
+        self.dragging = False
+        self.offset = QPoint()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.dragging = True
+            self.offset = event.pos()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self.dragging and (event.buttons() & Qt.LeftButton):
+            self.move(self.mapToParent(event.pos() - self.offset))
+            self.positionChanged.emit(self.x(), self.y())
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.dragging = False
+        super().mouseReleaseEvent(event)
+
+
+# 图片缓存的默认内存预算（MB）
+IMAGE_CACHE_MB = 1024
+
+
+class WatermarkApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+
+        # 初始化关键变量
+        self.images = []
+        self.current_image_index = -1
+        # 个性化设置：只为修改过的图片保存，多选修改时多张图片共用一个分组设置
+        self.per_image_settings = {}
+        self.group_overrides = None
+        self.loading_per_image_ui = False
+        # 解码后的图片缓存，按字节数限制
+        self.image_cache = LRUCache(capacity=100000, max_bytes=IMAGE_CACHE_MB * 1024 * 1024, sizeof=image_nbytes)
+        self.current_settings_type = "shared"  # 默认使用共享设置
+        self.draggable_watermark = None
+        self.custom_position_mode = False
+
+        # 默认共享设置
+        self.default_shared_settings = DEFAULT_SHARED_SETTINGS.copy()
+
+        # 默认个性化设置
+        self.default_per_image_settings = DEFAULT_PER_IMAGE_SETTINGS.copy()
+
+        # 渲染引擎（不读取界面控件）
+        self.renderer = WatermarkRenderer()
+
+        # 后台预览渲染线程
+        self.preview_worker = PreviewWorker(self)
+        self.preview_worker.rendered.connect(self.on_preview_rendered)
+        self.preview_worker.failed.connect(self.on_preview_failed)
+        self.preview_worker.start()
+
+        # 后台缩略图生成，列表项先显示占位图标
+        self.thumbnail_loader = ThumbnailLoader(self.renderer)
+        self.thumbnail_loader.loaded.connect(self.on_thumbnail_loaded)
+        placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        placeholder.fill(QColor(255, 255, 255, 60))
+        self.image_model = ImageListModel(self.images, self.thumbnail_loader, QIcon(placeholder))
+
+        # 初始化共享设置
+        self.shared_settings = self.default_shared_settings.copy()
+
+        try:
+            self.init_ui()
+            self.load_settings()
+
+            # 延迟更新预览的计时器
+            self.preview_timer = QTimer()
+            self.preview_timer.setSingleShot(True)
+            self.preview_timer.timeout.connect(self.update_preview_delayed)
+        except Exception as e:
+            print(f"初始化错误: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def init_ui(self):
+        self.setWindowTitle("高级图片水印工具 - 专业版")
+        self.setGeometry(100, 100, 1600, 900)  # 增加窗口宽度以适应三栏布局
+
+        # 应用样式表
+        self.setStyleSheet(APP_STYLESHEET)
+
+        # 创建中央部件
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        # 主布局 - 使用水平布局分为三部分
+        main_layout = QHBoxLayout(central_widget)
+        main_layout.setSpacing(15)
+        main_layout.setContentsMargins(20, 20, 20, 20)
+
+        # 左侧：图片列表区域 (20%)
+        left_panel = self.create_left_panel()
+        main_layout.addWidget(left_panel, 2)  # 比例2
+
+        # 中间：预览区域 (50%)
+        center_panel = self.create_center_panel()
+        main_layout.addWidget(center_panel, 5)  # 比例5
+
+        # 右侧：参数设置区域 (30%)
+        right_panel = self.create_right_panel()
+        main_layout.addWidget(right_panel, 3)  # 比例3
+
+    def create_left_panel(self):
+        # 左侧面板 - 图片列表
+        left_widget = QWidget()
+        left_widget.setMaximumWidth(400)  # 限制最大宽度
+        layout = QVBoxLayout(left_widget)
+        layout.setSpacing(12)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # 标题
+        title_label = QLabel("📷 图片列表")
+        title_label.setObjectName("title_label")
+        layout.addWidget(title_label)
+
+        # 导入按钮
+        import_layout = QHBoxLayout()
+        self.import_btn = QPushButton("📁 导入图片")
+        self.import_btn.clicked.connect(self.import_images)
+        import_layout.addWidget(self.import_btn)
+
+        self.import_folder_btn = QPushButton("📂 导入文件夹")
+        self.import_folder_btn.clicked.connect(self.import_folder)
+        import_layout.addWidget(self.import_folder_btn)
+
+        layout.addLayout(import_layout)
+
+        # 清空按钮
+        self.clear_btn = QPushButton("🗑️ 清空列表")
+        self.clear_btn.clicked.connect(self.clear_images)
+        layout.addWidget(self.clear_btn)
+
+        # 图片列表
+        self.image_list = QListView()
+        self.image_list.setIconSize(QSize(80, 80))
+        self.image_list.setUniformItemSizes(True)
+        self.image_list.setModel(self.image_model)
+        self.image_list.setSelectionMode(QListView.ExtendedSelection)
+        self.image_list.selectionModel().currentRowChanged.connect(
+            lambda current, previous: self.on_image_selected(current.row()))
+        self.image_list.selectionModel().selectionChanged.connect(self.on_image_selection_changed)
+        layout.addWidget(self.image_list)
+
+        return left_widget
+
+    def create_center_panel(self):
+        # 中间面板 - 预览区域
+        center_widget = QWidget()
+        layout = QVBoxLayout(center_widget)
+        layout.setSpacing(12)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # 预览控制
+        preview_control_layout = QHBoxLayout()
+
+        # 水印位置控制
+        preview_control_layout.addWidget(QLabel("水印位置:"))
+        self.position_combo = QComboBox()
+        self.position_combo.addItems(["左上角", "中上", "右上角", "左中", "居中", "右中", "左下角", "中下", "右下角", "自定义拖拽"])
+        self.position_combo.currentTextChanged.connect(self.on_position_changed)
+        preview_control_layout.addWidget(self.position_combo)
+
+        # 预览缩放
+        preview_control_layout.addWidget(QLabel("预览缩放:"))
+        self.zoom_slider = QSlider(Qt.Horizontal)
+        self.zoom_slider.setRange(10, 200)
+        self.zoom_slider.setValue(100)
+        self.zoom_slider.valueChanged.connect(self.on_zoom_changed)
+        preview_control_layout.addWidget(self.zoom_slider)
+
+        self.zoom_label = QLabel("100%")
+        preview_control_layout.addWidget(self.zoom_label)
+
+        preview_control_layout.addStretch()
+        layout.addLayout(preview_control_layout)
+
+        # 预览图像区域
+        preview_group = QGroupBox("👁️ 实时预览")
+        preview_layout = QVBoxLayout(preview_group)
+
+        self.preview_frame = QFrame()
+        self.preview_frame.setObjectName("preview_frame")
+        preview_frame_layout = QVBoxLayout(self.preview_frame)
+
+        self.preview_scroll = QScrollArea()
+        self.preview_scroll.setWidgetResizable(True)
+        self.preview_scroll.setAlignment(Qt.AlignCenter)
+
+        self.preview_label = QLabel()
+        self.preview_label.setAlignment(Qt.AlignCenter)
+        self.preview_label.setMinimumSize(500, 400)
+        self.preview_label.setText("🎨 导入图片后预览将显示在这里")
+        self.preview_label.setStyleSheet("font-size: 16px; color: #7f8c8d;")
+
+        # 设置预览标签可以接收拖拽
+        self.preview_label.setAcceptDrops(True)
+        self.preview_label.mousePressEvent = self.preview_mouse_press
+
+        self.preview_scroll.setWidget(self.preview_label)
+        preview_frame_layout.addWidget(self.preview_scroll)
+
+        preview_layout.addWidget(self.preview_frame)
+        layout.addWidget(preview_group)
+
+        # 导出按钮
+        export_btn_layout = QHBoxLayout()
+        export_btn_layout.addStretch()
+
+        self.export_btn = QPushButton("🚀 导出所有图片")
+        self.export_btn.clicked.connect(self.export_all_images)
+        self.export_btn.setStyleSheet("font-size: 16px; padding: 14px 28px;")
+        export_btn_layout.addWidget(self.export_btn)
+
+        self.resume_export_btn = QPushButton("继续上次导出")
+        self.resume_export_btn.setToolTip("从输出文件夹中的导出日志继续未完成的导出")
+        self.resume_export_btn.clicked.connect(self.resume_export)
+        self.resume_export_btn.setStyleSheet("font-size: 16px; padding: 14px 28px;")
+        export_btn_layout.addWidget(self.resume_export_btn)
+
+        export_btn_layout.addStretch()
+        layout.addLayout(export_btn_layout)
+
+        return center_widget
+
+    def create_right_panel(self):
+        # 右侧面板 - 参数设置
+        right_widget = QWidget()
+        right_widget.setMaximumWidth(500)  # 限制最大宽度
+        layout = QVBoxLayout(right_widget)
+        layout.setSpacing(12)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # 创建标签页
+        self.tabs = QTabWidget()
+        self.tabs.currentChanged.connect(self.on_tab_changed)  # 连接标签页切换信号
+
+        # 共享设置标签页
+        self.shared_tab = self.create_shared_tab()
+        self.tabs.addTab(self.shared_tab, "⚙️ 共享设置")
+
+        # 个性化设置标签页
+        self.per_image_tab = self.create_per_image_tab()
+        self.tabs.addTab(self.per_image_tab, "🎨 个性化设置")
+
+        # 导出设置标签页
+        self.export_tab = self.create_export_tab()
+        self.tabs.addTab(self.export_tab, "📤 导出设置")
+
+        # 模板管理标签页
+        self.template_tab = self.create_template_tab()
+        self.tabs.addTab(self.template_tab, "💾 模板管理")
+
+        layout.addWidget(self.tabs)
+
+        return right_widget
+
+    def create_shared_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        layout.setSpacing(12)
+
+        # 水印类型选择
+        type_group = QGroupBox("水印类型")
+        type_layout = QHBoxLayout(type_group)
+
+        self.watermark_type = QComboBox()
+        self.watermark_type.addItems(["文本水印", "图片水印"])
+        self.watermark_type.currentTextChanged.connect(self.on_watermark_type_changed)
+        type_layout.addWidget(QLabel("类型:"))
+        type_layout.addWidget(self.watermark_type)
+        type_layout.addStretch()
+
+        layout.addWidget(type_group)
+
+        # 文本水印设置
+        self.text_group = QGroupBox("文本水印设置")
+        text_layout = QGridLayout(self.text_group)
+
+        # 文本内容
+        text_layout.addWidget(QLabel("文本内容:"), 0, 0)
+        self.text_input = QLineEdit()
+        self.text_input.setText("水印")
+        self.text_input.textChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.text_input, 0, 1, 1, 2)
+
+        # 从EXIF获取日期按钮
+        self.exif_date_btn = QPushButton("使用EXIF日期")
+        self.exif_date_btn.clicked.connect(self.use_exif_date)
+        text_layout.addWidget(self.exif_date_btn, 0, 3)
+
+        # 字体设置
+        text_layout.addWidget(QLabel("字体:"), 1, 0)
+        self.font_combo = QComboBox()
+        # 获取系统所有字体，优先显示中文字体
+        font_db = QFontDatabase()
+        fonts = font_db.families()
+
+        # 优先显示中文字体
+        chinese_fonts = [f for f in fonts if any(char in f for char in '宋体黑体微软雅黑苹方') or
+                         any(keyword in f.lower() for keyword in ['simsun', 'simhei', 'microsoft', 'pingfang'])]
+        other_fonts = [f for f in fonts if f not in chinese_fonts]
+
+        self.font_combo.addItems(chinese_fonts[:20] + other_fonts[:30])
+        self.font_combo.setCurrentText("Microsoft YaHei")
+        self.font_combo.currentTextChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.font_combo, 1, 1, 1, 3)
+
+        # 字体大小
+        text_layout.addWidget(QLabel("字体大小:"), 2, 0)
+        self.font_size = QSpinBox()
+        self.font_size.setRange(10, 500)
+        self.font_size.setValue(40)  # 减小默认值
+        self.font_size.valueChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.font_size, 2, 1)
+
+        # 粗体和斜体
+        self.bold_check = QCheckBox("粗体")
+        self.bold_check.stateChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.bold_check, 2, 2)
+
+        self.italic_check = QCheckBox("斜体")
+        self.italic_check.stateChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.italic_check, 2, 3)
+
+        # 颜色选择
+        text_layout.addWidget(QLabel("颜色:"), 3, 0)
+        self.color_btn = QPushButton()
+        self.color_btn.setStyleSheet("background-color: #FFFFFF; border-radius: 4px; min-height: 20px;")
+        self.color_btn.clicked.connect(self.choose_color)
+        text_layout.addWidget(self.color_btn, 3, 1)
+
+        # 透明度
+        text_layout.addWidget(QLabel("透明度:"), 3, 2)
+        self.opacity_slider = QSlider(Qt.Horizontal)
+        self.opacity_slider.setRange(0, 100)
+        self.opacity_slider.setValue(80)
+        self.opacity_slider.valueChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.opacity_slider, 3, 3)
+
+        # 阴影效果
+        self.shadow_check = QCheckBox("阴影效果")
+        self.shadow_check.stateChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.shadow_check, 4, 0)
+
+        text_layout.addWidget(QLabel("阴影颜色:"), 4, 1)
+        self.shadow_color_btn = QPushButton()
+        self.shadow_color_btn.setStyleSheet("background-color: #000000; border-radius: 4px; min-height: 20px;")
+        self.shadow_color_btn.clicked.connect(self.choose_shadow_color)
+        text_layout.addWidget(self.shadow_color_btn, 4, 2)
+
+        text_layout.addWidget(QLabel("阴影偏移:"), 4, 3)
+        self.shadow_offset = QSpinBox()
+        self.shadow_offset.setRange(1, 10)
+        self.shadow_offset.setValue(2)
+        self.shadow_offset.valueChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.shadow_offset, 4, 4)
+
+        # 阴影模糊
+        text_layout.addWidget(QLabel("阴影模糊:"), 5, 0)
+        self.shadow_blur = QSpinBox()
+        self.shadow_blur.setRange(0, 10)
+        self.shadow_blur.setValue(2)
+        self.shadow_blur.valueChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.shadow_blur, 5, 1)
+
+        # 描边效果
+        self.outline_check = QCheckBox("描边效果")
+        self.outline_check.stateChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.outline_check, 6, 0)
+
+        text_layout.addWidget(QLabel("描边颜色:"), 6, 1)
+        self.outline_color_btn = QPushButton()
+        self.outline_color_btn.setStyleSheet("background-color: #000000; border-radius: 4px; min-height: 20px;")
+        self.outline_color_btn.clicked.connect(self.choose_outline_color)
+        text_layout.addWidget(self.outline_color_btn, 6, 2)
+
+        text_layout.addWidget(QLabel("描边宽度:"), 6, 3)
+        self.outline_width = QSpinBox()
+        self.outline_width.setRange(1, 10)
+        self.outline_width.setValue(1)
+        self.outline_width.valueChanged.connect(self.on_shared_parameter_changed)
+        text_layout.addWidget(self.outline_width, 6, 4)
+
+        layout.addWidget(self.text_group)
+
+        # 图片水印设置
+        self.image_group = QGroupBox("图片水印设置")
+        self.image_group.setVisible(False)
+        image_layout = QGridLayout(self.image_group)
+
+        # 选择图片水印
+        image_layout.addWidget(QLabel("水印图片:"), 0, 0)
+        self.image_path_label = QLabel("未选择")
+        image_layout.addWidget(self.image_path_label, 0, 1)
+
+        self.select_image_btn = QPushButton("选择图片")
+        self.select_image_btn.clicked.connect(self.select_watermark_image)
+        image_layout.addWidget(self.select_image_btn, 0, 2)
+
+        # 缩放设置
+        image_layout.addWidget(QLabel("缩放比例:"), 1, 0)
+        self.image_scale = QSpinBox()
+        self.image_scale.setRange(10, 500)
+        self.image_scale.setValue(100)
+        self.image_scale.setSuffix("%")
+        self.image_scale.valueChanged.connect(self.on_shared_parameter_changed)
+        image_layout.addWidget(self.image_scale, 1, 1)
+
+        # 透明度
+        image_layout.addWidget(QLabel("透明度:"), 1, 2)
+        self.image_opacity_slider = QSlider(Qt.Horizontal)
+        self.image_opacity_slider.setRange(0, 100)
+        self.image_opacity_slider.setValue(80)
+        self.image_opacity_slider.valueChanged.connect(self.on_shared_parameter_changed)
+        image_layout.addWidget(self.image_opacity_slider, 1, 3)
+
+        layout.addWidget(self.image_group)
+
+        # 旋转设置
+        rotation_group = QGroupBox("旋转")
+        rotation_layout = QHBoxLayout(rotation_group)
+
+        rotation_layout.addWidget(QLabel("旋转角度:"))
+        self.rotation_slider = QSlider(Qt.Horizontal)
+        self.rotation_slider.setRange(0, 360)
+        self.rotation_slider.setValue(0)
+        self.rotation_slider.valueChanged.connect(self.on_rotation_changed)
+        rotation_layout.addWidget(self.rotation_slider)
+
+        self.rotation_value = QLabel("0°")
+        rotation_layout.addWidget(self.rotation_value)
+
+        self.rotation_reset_btn = QPushButton("重置")
+        self.rotation_reset_btn.clicked.connect(self.reset_rotation)
+        rotation_layout.addWidget(self.rotation_reset_btn)
+
+        layout.addWidget(rotation_group)
+
+        layout.addStretch()
+
+        return tab
+
+    def create_per_image_tab(self):
+        # 个性化设置标签页 - 与共享设置相同的功能
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        layout.setSpacing(12)
+
+        # 提示信息
+        info_label = QLabel("⚠️ 个性化设置仅对当前选中的图片生效")
+        info_label.setStyleSheet(
+            "background: rgba(255, 235, 59, 0.3); padding: 10px; border-radius: 6px; font-weight: bold;")
+        info_label.setWordWrap(True)
+        layout.addWidget(info_label)
+
+        # 水印类型选择
+        type_group = QGroupBox("水印类型")
+        type_layout = QHBoxLayout(type_group)
+
+        self.per_image_watermark_type = QComboBox()
+        self.per_image_watermark_type.addItems(["文本水印", "图片水印"])
+        self.per_image_watermark_type.currentTextChanged.connect(self.on_per_image_watermark_type_changed)
+        type_layout.addWidget(QLabel("类型:"))
+        type_layout.addWidget(self.per_image_watermark_type)
+        type_layout.addStretch()
+
+        layout.addWidget(type_group)
+
+        # 文本水印设置
+        self.per_image_text_group = QGroupBox("文本水印设置")
+        text_layout = QGridLayout(self.per_image_text_group)
+
+        # 文本内容
+        text_layout.addWidget(QLabel("文本内容:"), 0, 0)
+        self.per_image_text_input = QLineEdit()
+        self.per_image_text_input.setPlaceholderText("为空时使用共享设置的文本内容")
+        self.per_image_text_input.textChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_text_input, 0, 1, 1, 2)
+
+        # 从EXIF获取日期按钮
+        self.per_image_exif_date_btn = QPushButton("使用EXIF日期")
+        self.per_image_exif_date_btn.clicked.connect(self.use_exif_date_per_image)
+        text_layout.addWidget(self.per_image_exif_date_btn, 0, 3)
+
+        # 字体设置
+        text_layout.addWidget(QLabel("字体:"), 1, 0)
+        self.per_image_font_combo = QComboBox()
+        font_db = QFontDatabase()
+        fonts = font_db.families()
+        chinese_fonts = [f for f in fonts if any(char in f for char in '宋体黑体微软雅黑苹方') or
+                         any(keyword in f.lower() for keyword in ['simsun', 'simhei', 'microsoft', 'pingfang'])]
+        other_fonts = [f for f in fonts if f not in chinese_fonts]
+        self.per_image_font_combo.addItems(chinese_fonts[:20] + other_fonts[:30])
+        self.per_image_font_combo.setCurrentText("Microsoft YaHei")
+        self.per_image_font_combo.currentTextChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_font_combo, 1, 1, 1, 3)
+
+        # 字体大小
+        text_layout.addWidget(QLabel("字体大小:"), 2, 0)
+        self.per_image_font_size = QSpinBox()
+        self.per_image_font_size.setRange(10, 500)
+        self.per_image_font_size.setValue(40)  # 减小默认值
+        self.per_image_font_size.valueChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_font_size, 2, 1)
+
+        # 粗体和斜体
+        self.per_image_bold_check = QCheckBox("粗体")
+        self.per_image_bold_check.stateChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_bold_check, 2, 2)
+
+        self.per_image_italic_check = QCheckBox("斜体")
+        self.per_image_italic_check.stateChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_italic_check, 2, 3)
+
+        # 颜色选择
+        text_layout.addWidget(QLabel("颜色:"), 3, 0)
+        self.per_image_color_btn = QPushButton()
+        self.per_image_color_btn.setStyleSheet("background-color: #FFFFFF; border-radius: 4px; min-height: 20px;")
+        self.per_image_color_btn.clicked.connect(self.choose_per_image_color)
+        text_layout.addWidget(self.per_image_color_btn, 3, 1)
+
+        # 透明度
+        text_layout.addWidget(QLabel("透明度:"), 3, 2)
+        self.per_image_opacity_slider = QSlider(Qt.Horizontal)
+        self.per_image_opacity_slider.setRange(0, 100)
+        self.per_image_opacity_slider.setValue(80)
+        self.per_image_opacity_slider.valueChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_opacity_slider, 3, 3)
+
+        # 阴影效果
+        self.per_image_shadow_check = QCheckBox("阴影效果")
+        self.per_image_shadow_check.stateChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_shadow_check, 4, 0)
+
+        text_layout.addWidget(QLabel("阴影颜色:"), 4, 1)
+        self.per_image_shadow_color_btn = QPushButton()
+        self.per_image_shadow_color_btn.setStyleSheet(
+            "background-color: #000000; border-radius: 4px; min-height: 20px;")
+        self.per_image_shadow_color_btn.clicked.connect(self.choose_per_image_shadow_color)
+        text_layout.addWidget(self.per_image_shadow_color_btn, 4, 2)
+
+        text_layout.addWidget(QLabel("阴影偏移:"), 4, 3)
+        self.per_image_shadow_offset = QSpinBox()
+        self.per_image_shadow_offset.setRange(1, 10)
+        self.per_image_shadow_offset.setValue(2)
+        self.per_image_shadow_offset.valueChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_shadow_offset, 4, 4)
+
+        # 阴影模糊
+        text_layout.addWidget(QLabel("阴影模糊:"), 5, 0)
+        self.per_image_shadow_blur = QSpinBox()
+        self.per_image_shadow_blur.setRange(0, 10)
+        self.per_image_shadow_blur.setValue(2)
+        self.per_image_shadow_blur.valueChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_shadow_blur, 5, 1)
+
+        # 描边效果
+        self.per_image_outline_check = QCheckBox("描边效果")
+        self.per_image_outline_check.stateChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_outline_check, 6, 0)
+
+        text_layout.addWidget(QLabel("描边颜色:"), 6, 1)
+        self.per_image_outline_color_btn = QPushButton()
+        self.per_image_outline_color_btn.setStyleSheet(
+            "background-color: #000000; border-radius: 4px; min-height: 20px;")
+        self.per_image_outline_color_btn.clicked.connect(self.choose_per_image_outline_color)
+        text_layout.addWidget(self.per_image_outline_color_btn, 6, 2)
+
+        text_layout.addWidget(QLabel("描边宽度:"), 6, 3)
+        self.per_image_outline_width = QSpinBox()
+        self.per_image_outline_width.setRange(1, 10)
+        self.per_image_outline_width.setValue(1)
+        self.per_image_outline_width.valueChanged.connect(self.on_per_image_parameter_changed)
+        text_layout.addWidget(self.per_image_outline_width, 6, 4)
+
+        layout.addWidget(self.per_image_text_group)
+
+        # 图片水印设置
+        self.per_image_image_group = QGroupBox("图片水印设置")
+        self.per_image_image_group.setVisible(False)
+        image_layout = QGridLayout(self.per_image_image_group)
+
+        # 选择图片水印
+        image_layout.addWidget(QLabel("水印图片:"), 0, 0)
+        self.per_image_image_path_label = QLabel("未选择")
+        image_layout.addWidget(self.per_image_image_path_label, 0, 1)
+
+        self.per_image_select_image_btn = QPushButton("选择图片")
+        self.per_image_select_image_btn.clicked.connect(self.select_per_image_watermark_image)
+        image_layout.addWidget(self.per_image_select_image_btn, 0, 2)
+
+        # 缩放设置
+        image_layout.addWidget(QLabel("缩放比例:"), 1, 0)
+        self.per_image_image_scale = QSpinBox()
+        self.per_image_image_scale.setRange(10, 500)
+        self.per_image_image_scale.setValue(100)
+        self.per_image_image_scale.setSuffix("%")
+        self.per_image_image_scale.valueChanged.connect(self.on_per_image_parameter_changed)
+        image_layout.addWidget(self.per_image_image_scale, 1, 1)
+
+        # 透明度
+        image_layout.addWidget(QLabel("透明度:"), 1, 2)
+        self.per_image_image_opacity_slider = QSlider(Qt.Horizontal)
+        self.per_image_image_opacity_slider.setRange(0, 100)
+        self.per_image_image_opacity_slider.setValue(80)
+        self.per_image_image_opacity_slider.valueChanged.connect(self.on_per_image_parameter_changed)
+        image_layout.addWidget(self.per_image_image_opacity_slider, 1, 3)
+
+        layout.addWidget(self.per_image_image_group)
+
+        # 旋转设置
+        rotation_group = QGroupBox("旋转")
+        rotation_layout = QHBoxLayout(rotation_group)
+
+        rotation_layout.addWidget(QLabel("旋转角度:"))
+        self.per_image_rotation_slider = QSlider(Qt.Horizontal)
+        self.per_image_rotation_slider.setRange(0, 360)
+        self.per_image_rotation_slider.setValue(0)
+        self.per_image_rotation_slider.valueChanged.connect(self.on_per_image_rotation_changed)
+        rotation_layout.addWidget(self.per_image_rotation_slider)
+
+        self.per_image_rotation_value = QLabel("0°")
+        rotation_layout.addWidget(self.per_image_rotation_value)
+
+        self.per_image_rotation_reset_btn = QPushButton("重置")
+        self.per_image_rotation_reset_btn.clicked.connect(self.reset_per_image_rotation)
+        rotation_layout.addWidget(self.per_image_rotation_reset_btn)
+
+        layout.addWidget(rotation_group)
+
+        # 位置偏移设置
+        offset_group = QGroupBox("位置偏移")
+        offset_layout = QGridLayout(offset_group)
+
+        offset_layout.addWidget(QLabel("水平偏移:"), 0, 0)
+        self.per_image_offset_x = QSpinBox()
+        self.per_image_offset_x.setRange(-500, 500)
+        self.per_image_offset_x.setValue(0)
+        self.per_image_offset_x.valueChanged.connect(self.on_per_image_parameter_changed)
+        offset_layout.addWidget(self.per_image_offset_x, 0, 1)
+
+        offset_layout.addWidget(QLabel("垂直偏移:"), 0, 2)
+        self.per_image_offset_y = QSpinBox()
+        self.per_image_offset_y.setRange(-500, 500)
+        self.per_image_offset_y.setValue(0)
+        self.per_image_offset_y.valueChanged.connect(self.on_per_image_parameter_changed)
+        offset_layout.addWidget(self.per_image_offset_y, 0, 3)
+
+        layout.addWidget(offset_group)
+
+        layout.addStretch()
+
+        return tab
+
+    def create_export_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        # 输出格式
+        format_group = QGroupBox("输出设置")
+        format_layout = QGridLayout(format_group)
+
+        format_layout.addWidget(QLabel("输出格式:"), 0, 0)
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(["JPEG", "PNG"])
+        self.format_combo.currentTextChanged.connect(self.on_format_changed)
+        format_layout.addWidget(self.format_combo, 0, 1)
+
+        # JPEG质量设置
+        format_layout.addWidget(QLabel("JPEG质量:"), 0, 2)
+        self.quality_slider = QSlider(Qt.Horizontal)
+        self.quality_slider.setRange(1, 100)
+        self.quality_slider.setValue(90)
+        self.quality_slider.valueChanged.connect(self.on_quality_changed)
+        format_layout.addWidget(self.quality_slider, 0, 3)
+
+        self.quality_label = QLabel("90")
+        format_layout.addWidget(self.quality_label, 0, 4)
+
+        # 输出文件夹
+        format_layout.addWidget(QLabel("输出文件夹:"), 1, 0)
+        self.output_path_label = QLabel("未选择")
+        format_layout.addWidget(self.output_path_label, 1, 1, 1, 2)
+
+        self.select_output_btn = QPushButton("选择文件夹")
+        self.select_output_btn.clicked.connect(self.select_output_folder)
+        format_layout.addWidget(self.select_output_btn, 1, 3)
+
+        layout.addWidget(format_group)
+
+        # 文件命名规则
+        naming_group = QGroupBox("文件命名")
+        naming_layout = QGridLayout(naming_group)
+
+        naming_layout.addWidget(QLabel("前缀:"), 0, 0)
+        self.prefix_input = QLineEdit()
+        self.prefix_input.textChanged.connect(self.on_shared_parameter_changed)
+        naming_layout.addWidget(self.prefix_input, 0, 1)
+
+        naming_layout.addWidget(QLabel("后缀:"), 1, 0)
+        self.suffix_input = QLineEdit("_watermarked")
+        self.suffix_input.textChanged.connect(self.on_shared_parameter_changed)
+        naming_layout.addWidget(self.suffix_input, 1, 1)
+
+        layout.addWidget(naming_group)
+
+        # 图片尺寸调整
+        resize_group = QGroupBox("图片尺寸调整")
+        resize_layout = QGridLayout(resize_group)
+
+        self.resize_check = QCheckBox("调整图片尺寸")
+        self.resize_check.stateChanged.connect(self.on_resize_changed)
+        resize_layout.addWidget(self.resize_check, 0, 0, 1, 2)
+
+        # 尺寸调整方式
+        resize_method_layout = QHBoxLayout()
+        self.resize_method_group = QButtonGroup()
+
+        self.resize_percent_radio = QRadioButton("按百分比")
+        self.resize_percent_radio.setChecked(True)
+        self.resize_method_group.addButton(self.resize_percent_radio)
+        resize_method_layout.addWidget(self.resize_percent_radio)
+
+        self.resize_dimension_radio = QRadioButton("按尺寸")
+        self.resize_method_group.addButton(self.resize_dimension_radio)
+        resize_method_layout.addWidget(self.resize_dimension_radio)
+
+        self.resize_method_group.buttonToggled.connect(self.on_resize_method_changed)
+        resize_layout.addLayout(resize_method_layout, 1, 0, 1, 4)
+
+        # 百分比调整
+        resize_layout.addWidget(QLabel("缩放百分比:"), 2, 0)
+        self.resize_percent = QSpinBox()
+        self.resize_percent.setRange(1, 500)
+        self.resize_percent.setValue(100)
+        self.resize_percent.setSuffix("%")
+        self.resize_percent.valueChanged.connect(self.on_shared_parameter_changed)
+        resize_layout.addWidget(self.resize_percent, 2, 1)
+
+        # 尺寸调整
+        resize_layout.addWidget(QLabel("宽度:"), 3, 0)
+        self.resize_width = QSpinBox()
+        self.resize_width.setRange(1, 10000)
+        self.resize_width.setValue(800)
+        self.resize_width.setSuffix(" px")
+        self.resize_width.setEnabled(False)
+        self.resize_width.valueChanged.connect(self.on_shared_parameter_changed)
+        resize_layout.addWidget(self.resize_width, 3, 1)
+
+        resize_layout.addWidget(QLabel("高度:"), 3, 2)
+        self.resize_height = QSpinBox()
+        self.resize_height.setRange(1, 10000)
+        self.resize_height.setValue(600)
+        self.resize_height.setSuffix(" px")
+        self.resize_height.setEnabled(False)
+        self.resize_height.valueChanged.connect(self.on_shared_parameter_changed)
+        resize_layout.addWidget(self.resize_height, 3, 3)
+
+        # 保持宽高比
+        self.keep_aspect_check = QCheckBox("保持宽高比")
+        self.keep_aspect_check.setChecked(True)
+        self.keep_aspect_check.stateChanged.connect(self.on_shared_parameter_changed)
+        resize_layout.addWidget(self.keep_aspect_check, 4, 0, 1, 2)
+
+        layout.addWidget(resize_group)
+
+        # 导出方式
+        parallel_group = QGroupBox("导出方式")
+        parallel_layout = QGridLayout(parallel_group)
+
+        self.parallel_export_check = QCheckBox("使用多进程并行导出")
+        self.parallel_export_check.setChecked(True)
+        self.parallel_export_check.stateChanged.connect(self.on_shared_parameter_changed)
+        parallel_layout.addWidget(self.parallel_export_check, 0, 0, 1, 2)
+
+        parallel_layout.addWidget(QLabel("进程数:"), 1, 0)
+        self.export_workers = QSpinBox()
+        self.export_workers.setRange(0, 256)
+        self.export_workers.setValue(0)
+        self.export_workers.setSpecialValueText(f"自动 ({default_worker_count()})")
+        self.export_workers.valueChanged.connect(self.on_shared_parameter_changed)
+        parallel_layout.addWidget(self.export_workers, 1, 1)
+
+        self.incremental_export_check = QCheckBox("增量导出（跳过源文件和设置都未变化的图片）")
+        self.incremental_export_check.setChecked(True)
+        self.incremental_export_check.stateChanged.connect(self.on_shared_parameter_changed)
+        parallel_layout.addWidget(self.incremental_export_check, 2, 0, 1, 2)
+
+        layout.addWidget(parallel_group)
+
+        layout.addStretch()
+
+        return tab
+
+    def create_template_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        # 模板操作按钮
+        template_btn_layout = QHBoxLayout()
+
+        self.save_template_btn = QPushButton("保存当前设置为模板")
+        self.save_template_btn.clicked.connect(self.save_template)
+        template_btn_layout.addWidget(self.save_template_btn)
+
+        self.load_template_btn = QPushButton("加载模板")
+        self.load_template_btn.clicked.connect(self.load_template)
+        template_btn_layout.addWidget(self.load_template_btn)
+
+        self.delete_template_btn = QPushButton("删除模板")
+        self.delete_template_btn.clicked.connect(self.delete_template)
+        template_btn_layout.addWidget(self.delete_template_btn)
+
+        layout.addLayout(template_btn_layout)
+
+        # 模板列表
+        self.template_list = QListWidget()
+        self.template_list.itemDoubleClicked.connect(self.load_template_from_list)
+        layout.addWidget(self.template_list)
+
+        # 加载默认模板
+        self.load_template_list()
+
+        # 自动加载设置
+        auto_load_group = QGroupBox("自动加载设置")
+        auto_load_layout = QHBoxLayout(auto_load_group)
+
+        self.auto_load_check = QCheckBox("启动时自动加载上次使用的设置")
+        auto_load_layout.addWidget(self.auto_load_check)
+
+        layout.addWidget(auto_load_group)
+
+        # 图片缓存设置
+        cache_group = QGroupBox("图片缓存")
+        cache_layout = QGridLayout(cache_group)
+
+        cache_layout.addWidget(QLabel("内存上限:"), 0, 0)
+        self.image_cache_mb = QSpinBox()
+        self.image_cache_mb.setRange(64, 65536)
+        self.image_cache_mb.setSingleStep(256)
+        self.image_cache_mb.setSuffix(" MB")
+        self.image_cache_mb.setValue(IMAGE_CACHE_MB)
+        self.image_cache_mb.valueChanged.connect(self.on_cache_settings_changed)
+        cache_layout.addWidget(self.image_cache_mb, 0, 1)
+
+        self.proxy_cache_check = QCheckBox("未选中的图片只缓存缩小的预览图")
+        cache_layout.addWidget(self.proxy_cache_check, 1, 0, 1, 2)
+
+        self.cache_stats_label = QLabel()
+        self.cache_stats_label.setWordWrap(True)
+        cache_layout.addWidget(self.cache_stats_label, 2, 0, 1, 2)
+
+        layout.addWidget(cache_group)
+
+        layout.addStretch()
+
+        return tab
+
+    def on_tab_changed(self, index):
+        """标签页切换时的处理"""
+        if index == 0:  # 共享设置标签页
+            self.current_settings_type = "shared"
+        elif index == 1:  # 个性化设置标签页
+            self.current_settings_type = "per_image"
+            # 更新个性化设置UI
+            if self.current_image_index >= 0:
+                self.apply_per_image_settings_to_ui()
+
+        # 更新预览
+        self.update_preview()
+
+    def on_shared_parameter_changed(self):
+        """共享参数改变时的处理"""
+        # 保存共享设置
+        self.save_shared_settings_from_ui()
+
+        # 如果当前使用的是共享设置，则更新预览
+        if self.current_settings_type == "shared":
+            self.schedule_preview_update()
+
+    def on_per_image_parameter_changed(self):
+        """个性化参数改变时的处理"""
+        # 保存个性化设置
+        self.save_per_image_settings_from_ui()
+
+        # 如果当前使用的是个性化设置，则更新预览
+        if self.current_settings_type == "per_image":
+            self.schedule_preview_update()
+
+    def on_watermark_type_changed(self, text):
+        is_text = text == "文本水印"
+        self.text_group.setVisible(is_text)
+        self.image_group.setVisible(not is_text)
+        self.on_shared_parameter_changed()
+
+    def on_per_image_watermark_type_changed(self, text):
+        is_text = text == "文本水印"
+        self.per_image_text_group.setVisible(is_text)
+        self.per_image_image_group.setVisible(not is_text)
+        self.on_per_image_parameter_changed()
+
+    def on_format_changed(self, text):
+        is_jpeg = text == "JPEG"
+        self.quality_slider.setEnabled(is_jpeg)
+        self.quality_label.setEnabled(is_jpeg)
+
+    def on_quality_changed(self, value):
+        self.quality_label.setText(str(value))
+
+    def on_resize_changed(self, state):
+        enabled = state == Qt.Checked
+        self.resize_percent.setEnabled(enabled and self.resize_percent_radio.isChecked())
+        self.resize_width.setEnabled(enabled and self.resize_dimension_radio.isChecked())
+        self.resize_height.setEnabled(enabled and self.resize_dimension_radio.isChecked())
+        self.keep_aspect_check.setEnabled(enabled and self.resize_dimension_radio.isChecked())
+        self.on_shared_parameter_changed()
+
+    def on_resize_method_changed(self, button, checked):
+        if not checked:
+            return
+
+        is_percent = button == self.resize_percent_radio
+        self.resize_percent.setEnabled(is_percent and self.resize_check.isChecked())
+        self.resize_width.setEnabled(not is_percent and self.resize_check.isChecked())
+        self.resize_height.setEnabled(not is_percent and self.resize_check.isChecked())
+        self.keep_aspect_check.setEnabled(not is_percent and self.resize_check.isChecked())
+        self.on_shared_parameter_changed()
+
+    def on_position_changed(self, position):
+        self.shared_settings["position"] = position
+        if position == "自定义拖拽":
+            self.enable_custom_position()
+        else:
+            self.disable_custom_position()
+            self.schedule_preview_update()
+
+    def on_rotation_changed(self, value):
+        self.rotation_value.setText(f"{value}°")
+        self.on_shared_parameter_changed()
+
+    def on_per_image_rotation_changed(self, value):
+        self.per_image_rotation_value.setText(f"{value}°")
+        self.on_per_image_parameter_changed()
+
+    def on_zoom_changed(self, value):
+        self.zoom_label.setText(f"{value}%")
+        self.update_preview()
+
+    def choose_color(self):
+        color = QColorDialog.getColor()
+        if color.isValid():
+            self.color_btn.setStyleSheet(f"background-color: {color.name()}; border-radius: 4px; min-height: 20px;")
+            self.shared_settings["color"] = color.name()
+            self.on_shared_parameter_changed()
+
+    def choose_per_image_color(self):
+        color = QColorDialog.getColor()
+        if color.isValid():
+            self.per_image_color_btn.setStyleSheet(
+                f"background-color: {color.name()}; border-radius: 4px; min-height: 20px;")
+            # 更新个性化设置中的颜色
+            if self.current_image_index >= 0:
+                self.edit_per_image_settings()["color"] = color.name()
+            self.on_per_image_parameter_changed()
+
+    def choose_shadow_color(self):
+        color = QColorDialog.getColor()
+        if color.isValid():
+            self.shadow_color_btn.setStyleSheet(
+                f"background-color: {color.name()}; border-radius: 4px; min-height: 20px;")
+            self.shared_settings["shadow_color"] = color.name()
+            self.on_shared_parameter_changed()
+
+    def choose_per_image_shadow_color(self):
+        color = QColorDialog.getColor()
+        if color.isValid():
+            self.per_image_shadow_color_btn.setStyleSheet(
+                f"background-color: {color.name()}; border-radius: 4px; min-height: 20px;")
+            # 更新个性化设置中的阴影颜色
+            if self.current_image_index >= 0:
+                self.edit_per_image_settings()["shadow_color"] = color.name()
+            self.on_per_image_parameter_changed()
+
+    def choose_outline_color(self):
+        color = QColorDialog.getColor()
+        if color.isValid():
+            self.outline_color_btn.setStyleSheet(
+                f"background-color: {color.name()}; border-radius: 4px; min-height: 20px;")
+            self.shared_settings["outline_color"] = color.name()
+            self.on_shared_parameter_changed()
+
+    def choose_per_image_outline_color(self):
+        color = QColorDialog.getColor()
+        if color.isValid():
+            self.per_image_outline_color_btn.setStyleSheet(
+                f"background-color: {color.name()}; border-radius: 4px; min-height: 20px;")
+            # 更新个性化设置中的描边颜色
+            if self.current_image_index >= 0:
+                self.edit_per_image_settings()["outline_color"] = color.name()
+            self.on_per_image_parameter_changed()
+
+    def select_watermark_image(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择水印图片", "",
+                                              "图片文件 (*.png *.jpg *.jpeg *.bmp *.tiff)")
+        if path:
+            self.image_path_label.setText(os.path.basename(path))
+            self.shared_settings["image_path"] = path
+            self.on_shared_parameter_changed()
+
+    def select_per_image_watermark_image(self):
+        path, _ = QFileDialog.getOpenFileName(self, "选择水印图片", "",
+                                              "图片文件 (*.png *.jpg *.jpeg *.bmp *.tiff)")
+        if path:
+            self.per_image_image_path_label.setText(os.path.basename(path))
+            if self.current_image_index >= 0:
+                self.edit_per_image_settings()["image_path"] = path
+            self.on_per_image_parameter_changed()
+
+    def select_output_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "选择输出文件夹")
+        if path:
+            self.output_path_label.setText(path)
+
+    def import_images(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "选择图片", "",
+                                                f"图片文件 ({' '.join('*' + ext for ext in IMAGE_EXTENSIONS)})")
+        if paths:
+            self.add_images(paths)
+
+    def import_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "选择图片文件夹")
+        if path:
+            # 获取文件夹中所有支持的图片文件
+            image_paths = []
+            for root, dirs, files in os.walk(path):
+                for file in files:
+                    if file.lower().endswith(IMAGE_EXTENSIONS):
+                        image_paths.append(os.path.join(root, file))
+
+            if image_paths:
+                self.add_images(image_paths)
+            else:
+                QMessageBox.warning(self, "警告", "选择的文件夹中没有找到支持的图片文件")
+
+    def add_images(self, paths):
+        # 一次性插入所有新图片，缩略图在列表项显示时才生成；个性化设置在修改时才创建
+        self.image_model.add_paths(paths)
+
+        # 在后台并行读取所有新图片的文件头信息（方向、拍摄日期），缩略图、预览和导出直接命中缓存
+        threading.Thread(target=get_metadata_index().extract_all, args=(list(paths),), daemon=True).start()
+
+        # 如果有图片，选择第一个
+        if self.images and self.current_image_index == -1:
+            self.image_list.setCurrentIndex(self.image_model.index(0))
+
+    def on_thumbnail_loaded(self, path, qimage):
+        index = self.image_model.set_thumbnail(path, QIcon(QPixmap.fromImage(qimage)))
+        if index is not None:
+            self.image_list.viewport().update(self.image_list.visualRect(index))
+
+    def load_and_fix_image(self, path, max_size=None):
+        """加载并修复图片（处理方向、模式等问题）
+
+        返回的图片与缓存共享，调用方不能修改（渲染时会另外分配输出图片）。
+        缓存中只有缩小的预览图、且不足以按 max_size 显示时重新加载原图。
+        """
+        try:
+            image = self.image_cache.get(path)
+            if image is not None and (max_size is None or proxy_covers(image, max_size)):
+                return image
+
+            image = self.renderer.load_image(path)
+            image.load()
+
+            self.image_cache.put(path, image)
+            return image
+        except Exception as e:
+            print(f"加载图片错误: {str(e)}")
+            return None
+
+    def fix_image_orientation(self, image):
+        """修复图片方向（处理EXIF方向信息）"""
+        return self.renderer.fix_image_orientation(image)
+
+    def shrink_cached_image(self, path):
+        """把缓存中的原图替换为缩小的预览图（用于不再选中的图片）
+
+        缩小大图需要几十毫秒以上，在缩略图线程池中进行，不阻塞切换图片。
+        """
+        image = self.image_cache.get(path)
+        if image is not None and max(image.size) > PREVIEW_PROXY_SIZE:
+            self.thumbnail_loader.executor.submit(self.replace_with_proxy, path, image)
+
+    def replace_with_proxy(self, path, image):
+        """在后台线程中运行：缩小期间图片又被选中、或缓存中的图片已被替换时不再替换"""
+        try:
+            proxy = make_proxy(image)
+            index = self.current_image_index
+            if 0 <= index < len(self.images) and self.images[index] == path:
+                return
+            self.image_cache.replace(path, image, proxy)
+        except Exception as e:
+            print(f"缩小缓存图片错误: {str(e)}")
+
+    def on_cache_settings_changed(self):
+        self.image_cache.set_max_bytes(self.image_cache_mb.value() * 1024 * 1024)
+        self.update_cache_stats()
+
+    def update_cache_stats(self):
+        stats = self.image_cache.stats()
+        self.cache_stats_label.setText(
+            f"已用 {stats['bytes'] / 1024 / 1024:.0f} MB，{stats['size']} 张；"
+            f"命中 {stats['hits']} 次，未命中 {stats['misses']} 次，淘汰 {stats['evictions']} 次\n"
+            f"预览渲染缓存 - {format_cache_stats(self.renderer.cache_stats())}")
+
+    def clear_images(self):
+        """清空图片列表并重置所有参数"""
+        self.image_model.clear()
+        self.current_image_index = -1
+        self.per_image_settings.clear()
+        self.group_overrides = None
+        self.image_cache.clear()
+        self.update_cache_stats()
+        self.thumbnail_loader.cancel_all()
+
+        # 重置共享设置为默认值
+        self.shared_settings = self.default_shared_settings.copy()
+
+        # 重置UI控件为默认值
+        self.apply_shared_settings_to_ui()
+
+        # 重置个性化设置UI为默认值
+        self.reset_per_image_ui_to_default()
+
+        self.preview_label.setText("🎨 导入图片后预览将显示在这里")
+        if self.draggable_watermark:
+            self.draggable_watermark.setParent(None)
+            self.draggable_watermark = None
+
+        # 重置当前设置类型
+        self.current_settings_type = "shared"
+        self.tabs.setCurrentIndex(0)
+
+    def reset_per_image_ui_to_default(self):
+        """重置个性化设置UI为默认值"""
+        self.per_image_watermark_type.setCurrentText("文本水印")
+        self.per_image_text_input.clear()
+        self.per_image_font_combo.setCurrentText("Microsoft YaHei")
+        self.per_image_font_size.setValue(40)
+        self.per_image_bold_check.setChecked(False)
+        self.per_image_italic_check.setChecked(False)
+        self.per_image_color_btn.setStyleSheet("background-color: #FFFFFF; border-radius: 4px; min-height: 20px;")
+        self.per_image_opacity_slider.setValue(80)
+        self.per_image_rotation_slider.setValue(0)
+        self.per_image_shadow_check.setChecked(False)
+        self.per_image_shadow_color_btn.setStyleSheet(
+            "background-color: #000000; border-radius: 4px; min-height: 20px;")
+        self.per_image_shadow_offset.setValue(2)
+        self.per_image_shadow_blur.setValue(2)
+        self.per_image_outline_check.setChecked(False)
+        self.per_image_outline_color_btn.setStyleSheet(
+            "background-color: #000000; border-radius: 4px; min-height: 20px;")
+        self.per_image_outline_width.setValue(1)
+        self.per_image_image_path_label.setText("未选择")
+        self.per_image_image_scale.setValue(100)
+        self.per_image_image_opacity_slider.setValue(80)
+        self.per_image_offset_x.setValue(0)
+        self.per_image_offset_y.setValue(0)
+
+    def on_image_selected(self, index):
+        if index >= 0 and index < len(self.images):
+            if self.proxy_cache_check.isChecked() and 0 <= self.current_image_index < len(self.images):
+                self.shrink_cached_image(self.images[self.current_image_index])
+            self.current_image_index = index
+            # 切换到个性化设置标签页
+            self.tabs.setCurrentIndex(1)
+            self.current_settings_type = "per_image"
+            # 更新个性化设置UI
+            self.apply_per_image_settings_to_ui()
+            self.update_preview()
+
+    def preview_mouse_press(self, event):
+        if event.button() == Qt.LeftButton and self.custom_position_mode:
+            self.add_draggable_watermark(event.pos())
+
+    def enable_custom_position(self):
+        self.custom_position_mode = True
+        self.preview_label.setText("👆 点击图片放置水印，然后拖拽调整位置")
+        self.preview_label.setCursor(Qt.CrossCursor)
+
+    def disable_custom_position(self):
+        self.custom_position_mode = False
+        self.preview_label.setCursor(Qt.ArrowCursor)
+        if self.draggable_watermark:
+            self.draggable_watermark.setParent(None)
+            self.draggable_watermark = None
+
+    def add_draggable_watermark(self, pos):
+        if self.draggable_watermark:
+            self.draggable_watermark.setParent(None)
+
+        self.draggable_watermark = DraggableLabel(self.preview_label)
+
+        # 获取当前设置类型
+        if self.current_settings_type == "shared":
+            watermark_type = self.watermark_type.currentText()
+        else:
+            watermark_type = self.per_image_watermark_type.currentText()
+
+        if watermark_type == "文本水印":
+            if self.current_settings_type == "shared":
+                text = self.text_input.text()
+                font_size = self.font_size.value()
+                font_family = self.font_combo.currentText()
+                bold = self.bold_check.isChecked()
+                italic = self.italic_check.isChecked()
+            else:
+                text = self.get_current_per_image_text()
+                font_size = self.per_image_font_size.value()
+                font_family = self.per_image_font_combo.currentText()
+                bold = self.per_image_bold_check.isChecked()
+                italic = self.per_image_italic_check.isChecked()
+
+            self.draggable_watermark.setText(text)
+
+            font = QFont(font_family, min(font_size // 10, 50))
+            font.setBold(bold)
+            font.setItalic(italic)
+            self.draggable_watermark.setFont(font)
+
+            color = self.get_render_settings().get("color", "#FFFFFF")
+
+            self.draggable_watermark.setStyleSheet(
+                f"color: {color}; background-color: rgba(255, 255, 255, 0.7); border: 2px dashed #7b68ee; border-radius: 8px; font-size: 14px;")
+        else:
+            if self.current_settings_type == "shared":
+                image_path = self.shared_settings["image_path"]
+                scale = self.image_scale.value()
+            else:
+                image_path = self.get_current_per_image_path()
+                scale = self.per_image_image_scale.value()
+
+            if image_path and os.path.exists(image_path):
+                try:
+                    pixmap = QPixmap(image_path)
+                    if not pixmap.isNull():
+                        scale = scale / 100.0
+                        new_size = QSize(int(pixmap.width() * scale), int(pixmap.height() * scale))
+                        pixmap = pixmap.scaled(new_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                        self.draggable_watermark.setPixmap(pixmap)
+                except:
+                    pass
+
+        self.draggable_watermark.adjustSize()
+        self.draggable_watermark.move(pos)
+        self.draggable_watermark.show()
+        self.draggable_watermark.positionChanged.connect(self.on_watermark_dragged)
+
+    def on_watermark_dragged(self, x, y):
+        if self.current_image_index >= 0:
+            settings = self.edit_per_image_settings()
+            settings["offset_x"] = x
+            settings["offset_y"] = y
+            self.schedule_preview_update()
+
+    def schedule_preview_update(self):
+        """参数变化时立即渲染快速草图，停止操作一段时间后再渲染完整质量的预览"""
+        self.update_preview(draft=True)
+        self.preview_timer.start(300)
+
+    def update_preview_delayed(self):
+        self.update_preview()
+
+    def update_preview(self, draft=False):
+        if self.current_image_index < 0 or self.current_image_index >= len(self.images):
+            return
+
+        image_path = self.images[self.current_image_index]
+
+        # 预览区域尺寸
+        zoom_factor = self.zoom_slider.value() / 100.0
+        preview_size = self.preview_label.size()
+        scaled_width = int(preview_size.width() * zoom_factor)
+        scaled_height = int(preview_size.height() * zoom_factor)
+
+        # 在后台线程中渲染，界面线程只负责提交当前设置
+        self.preview_worker.submit(image_path, self.get_render_settings(), (scaled_width, scaled_height), draft)
+
+    def on_preview_rendered(self, generation, qimage, draft):
+        """显示后台渲染完成的预览（忽略已过期的结果）"""
+        if self.preview_worker.is_stale(generation):
+            return
+
+        zoom_factor = self.zoom_slider.value() / 100.0
+        preview_size = self.preview_label.size()
+        scaled_width = int(preview_size.width() * zoom_factor)
+        scaled_height = int(preview_size.height() * zoom_factor)
+
+        # 草图只有显示尺寸的一部分，直接快速放大
+        pixmap = QPixmap.fromImage(qimage)
+        transformation = Qt.FastTransformation if draft else Qt.SmoothTransformation
+        scaled_pixmap = pixmap.scaled(scaled_width, scaled_height, Qt.KeepAspectRatio, transformation)
+        self.preview_label.setPixmap(scaled_pixmap)
+        self.update_cache_stats()
+
+    def on_preview_failed(self, generation, message):
+        if not self.preview_worker.is_stale(generation):
+            self.preview_label.setText(message)
+
+    def add_watermark_to_image(self, image):
+        return self.renderer.render(image, self.get_render_settings())
+
+    def get_render_settings(self):
+        """根据当前设置类型生成渲染用的有效设置"""
+        per_image = None
+        if 0 <= self.current_image_index < len(self.images):
+            per_image = self.get_per_image_settings(self.images[self.current_image_index])
+
+        if self.current_settings_type == "per_image" and per_image is not None:
+            settings = resolve_settings(self.shared_settings, per_image)
+        else:
+            settings = resolve_settings(self.shared_settings)
+            offset_x, offset_y = self.get_current_offset()
+            settings["offset_x"] = offset_x
+            settings["offset_y"] = offset_y
+
+        # 自定义拖拽时记录预览图尺寸，用于换算拖拽坐标
+        if settings["position"] == CUSTOM_POSITION and self.draggable_watermark:
+            settings["custom_drag"] = True
+            preview_pixmap = self.preview_label.pixmap()
+            if preview_pixmap:
+                settings["preview_size"] = (preview_pixmap.width(), preview_pixmap.height())
+
+        return settings
+
+    def get_current_text(self):
+        """获取当前文本"""
+        if self.current_settings_type == "shared":
+            return self.text_input.text()
+        else:
+            if self.current_image_index >= 0:
+                image_path = self.images[self.current_image_index]
+                per_image_text = self.get_per_image_settings(image_path).get("text", "")
+                # 如果个性化文本为空，则使用共享文本
+                return per_image_text if per_image_text else self.text_input.text()
+            return self.text_input.text()
+
+    def get_current_per_image_text(self):
+        """获取个性化文本"""
+        if self.current_image_index >= 0:
+            image_path = self.images[self.current_image_index]
+            return self.get_per_image_settings(image_path).get("text", "")
+        return ""
+
+    def get_current_per_image_path(self):
+        """获取个性化图片路径"""
+        if self.current_image_index >= 0:
+            image_path = self.images[self.current_image_index]
+            return self.get_per_image_settings(image_path).get("image_path", "")
+        return ""
+
+    def get_current_font_size(self):
+        """获取当前字体大小"""
+        if self.current_settings_type == "shared":
+            return self.font_size.value()
+        else:
+            if self.current_image_index >= 0:
+                image_path = self.images[self.current_image_index]
+                return self.get_per_image_settings(image_path).get("font_size", self.font_size.value())
+            return self.font_size.value()
+
+    def get_current_offset(self):
+        """获取当前偏移量"""
+        if self.current_image_index >= 0:
+            settings = self.get_per_image_settings(self.images[self.current_image_index])
+            return settings.get("offset_x", 0), settings.get("offset_y", 0)
+        return (0, 0)
+
+    def apply_shared_settings_to_ui(self):
+        """应用共享设置到UI"""
+        # 控件信号会回写共享设置，先保存一份快照
+        settings = self.shared_settings.copy()
+        self.watermark_type.setCurrentText("文本水印" if settings["type"] == "text" else "图片水印")
+        self.text_input.setText(settings["text"])
+        self.font_combo.setCurrentText(settings["font_family"])
+        self.font_size.setValue(settings["font_size"])
+        self.bold_check.setChecked(settings["bold"])
+        self.italic_check.setChecked(settings["italic"])
+
+        color = settings["color"]
+        self.color_btn.setStyleSheet(f"background-color: {color}; border-radius: 4px; min-height: 20px;")
+
+        self.opacity_slider.setValue(settings["opacity"])
+        self.position_combo.setCurrentText(settings["position"])
+        self.rotation_slider.setValue(settings["rotation"])
+        self.shadow_check.setChecked(settings["shadow"])
+
+        shadow_color = settings["shadow_color"]
+        self.shadow_color_btn.setStyleSheet(f"background-color: {shadow_color}; border-radius: 4px; min-height: 20px;")
+
+        self.shadow_offset.setValue(settings["shadow_offset"])
+        self.shadow_blur.setValue(settings["shadow_blur"])
+        self.outline_check.setChecked(settings["outline"])
+
+        outline_color = settings["outline_color"]
+        self.outline_color_btn.setStyleSheet(
+            f"background-color: {outline_color}; border-radius: 4px; min-height: 20px;")
+
+        self.outline_width.setValue(settings["outline_width"])
+        self.image_path_label.setText(
+            os.path.basename(settings["image_path"]) if settings["image_path"] else "未选择")
+        self.image_scale.setValue(settings["image_scale"])
+        self.image_opacity_slider.setValue(settings.get("image_opacity", settings["opacity"]))
+
+        # 导出设置
+        self.format_combo.setCurrentText(settings["output_format"])
+        self.quality_slider.setValue(settings["quality"])
+        self.prefix_input.setText(settings["naming_prefix"])
+        self.suffix_input.setText(settings["naming_suffix"])
+        self.resize_check.setChecked(settings["resize_enabled"])
+        if settings.get("resize_mode", "percent") == "percent":
+            self.resize_percent_radio.setChecked(True)
+        else:
+            self.resize_dimension_radio.setChecked(True)
+        self.keep_aspect_check.setChecked(settings.get("keep_aspect", True))
+        self.resize_percent.setValue(settings["resize_percent"])
+        self.resize_width.setValue(settings["resize_width"])
+        self.resize_height.setValue(settings["resize_height"])
+        self.parallel_export_check.setChecked(settings.get("parallel_export", True))
+        self.export_workers.setValue(settings.get("export_workers", 0))
+        self.incremental_export_check.setChecked(settings.get("incremental_export", True))
+
+        self.shared_settings.update(settings)
+
+    def apply_per_image_settings_to_ui(self):
+        """应用个性化设置到UI"""
+        if self.current_image_index >= 0:
+            settings = self.get_per_image_settings(self.images[self.current_image_index])
+            # 设置控件时不回写个性化设置（否则只是选中图片也会创建设置）
+            self.loading_per_image_ui = True
+
+            # 设置水印类型
+            self.per_image_watermark_type.setCurrentText("文本水印" if settings.get("type", "text") == "text" else "图片水印")
+
+            # 文本设置
+            self.per_image_text_input.setText(settings.get("text", ""))
+            self.per_image_font_combo.setCurrentText(settings.get("font_family", "Microsoft YaHei"))
+            self.per_image_font_size.setValue(settings.get("font_size", 40))
+            self.per_image_bold_check.setChecked(settings.get("bold", False))
+            self.per_image_italic_check.setChecked(settings.get("italic", False))
+
+            color = settings.get("color", "#FFFFFF")
+            self.per_image_color_btn.setStyleSheet(f"background-color: {color}; border-radius: 4px; min-height: 20px;")
+
+            self.per_image_opacity_slider.setValue(settings.get("opacity", 80))
+            self.per_image_rotation_slider.setValue(settings.get("rotation", 0))
+            self.per_image_shadow_check.setChecked(settings.get("shadow", False))
+
+            shadow_color = settings.get("shadow_color", "#000000")
+            self.per_image_shadow_color_btn.setStyleSheet(
+                f"background-color: {shadow_color}; border-radius: 4px; min-height: 20px;")
+
+            self.per_image_shadow_offset.setValue(settings.get("shadow_offset", 2))
+            self.per_image_shadow_blur.setValue(settings.get("shadow_blur", 2))
+            self.per_image_outline_check.setChecked(settings.get("outline", False))
+
+            outline_color = settings.get("outline_color", "#000000")
+            self.per_image_outline_color_btn.setStyleSheet(
+                f"background-color: {outline_color}; border-radius: 4px; min-height: 20px;")
+
+            self.per_image_outline_width.setValue(settings.get("outline_width", 1))
+
+            # 图片水印设置
+            self.per_image_image_path_label.setText(
+                os.path.basename(settings.get("image_path", "")) if settings.get("image_path") else "未选择")
+            self.per_image_image_scale.setValue(settings.get("image_scale", 100))
+            self.per_image_image_opacity_slider.setValue(settings.get("image_opacity", settings.get("opacity", 80)))
+
+            # 位置偏移
+            self.per_image_offset_x.setValue(settings.get("offset_x", 0))
+            self.per_image_offset_y.setValue(settings.get("offset_y", 0))
+
+            self.loading_per_image_ui = False
+
+    def save_shared_settings_from_ui(self):
+        """从UI保存共享设置"""
+        self.shared_settings.update({
+            "type": "text" if self.watermark_type.currentText() == "文本水印" else "image",
+            "text": self.text_input.text(),
+            "font_family": self.font_combo.currentText(),
+            "font_size": self.font_size.value(),
+            "bold": self.bold_check.isChecked(),
+            "italic": self.italic_check.isChecked(),
+            "opacity": self.opacity_slider.value(),
+            "position": self.position_combo.currentText(),
+            "rotation": self.rotation_slider.value(),
+            "shadow": self.shadow_check.isChecked(),
+            "shadow_offset": self.shadow_offset.value(),
+            "shadow_blur": self.shadow_blur.value(),
+            "outline": self.outline_check.isChecked(),
+            "outline_width": self.outline_width.value(),
+            "image_scale": self.image_scale.value(),
+            "image_opacity": self.image_opacity_slider.value(),
+            "output_format": self.format_combo.currentText(),
+            "quality": self.quality_slider.value(),
+            "resize_enabled": self.resize_check.isChecked(),
+            "resize_mode": "percent" if self.resize_percent_radio.isChecked() else "dimension",
+            "resize_percent": self.resize_percent.value(),
+            "resize_width": self.resize_width.value(),
+            "resize_height": self.resize_height.value(),
+            "keep_aspect": self.keep_aspect_check.isChecked(),
+            "parallel_export": self.parallel_export_check.isChecked(),
+            "export_workers": self.export_workers.value(),
+            "incremental_export": self.incremental_export_check.isChecked(),
+            "naming_prefix": self.prefix_input.text(),
+            "naming_suffix": self.suffix_input.text()
+        })
+
+    def save_per_image_settings_from_ui(self):
+        """从UI保存个性化设置"""
+        if self.current_image_index >= 0 and not self.loading_per_image_ui:
+            self.edit_per_image_settings().update({
+                "type": "text" if self.per_image_watermark_type.currentText() == "文本水印" else "image",
+                "text": self.per_image_text_input.text(),
+                "font_family": self.per_image_font_combo.currentText(),
+                "font_size": self.per_image_font_size.value(),
+                "bold": self.per_image_bold_check.isChecked(),
+                "italic": self.per_image_italic_check.isChecked(),
+                "opacity": self.per_image_opacity_slider.value(),
+                "rotation": self.per_image_rotation_slider.value(),
+                "shadow": self.per_image_shadow_check.isChecked(),
+                "shadow_offset": self.per_image_shadow_offset.value(),
+                "shadow_blur": self.per_image_shadow_blur.value(),
+                "outline": self.per_image_outline_check.isChecked(),
+                "outline_width": self.per_image_outline_width.value(),
+                "image_scale": self.per_image_image_scale.value(),
+                "image_opacity": self.per_image_image_opacity_slider.value(),
+                "offset_x": self.per_image_offset_x.value(),
+                "offset_y": self.per_image_offset_y.value()
+            })
+
+    def use_exif_date(self):
+        if self.current_image_index < 0:
+            QMessageBox.information(self, "提示", "请先选择一张图片")
+            return
+
+        image_path = self.images[self.current_image_index]
+        date = self.get_exif_date(image_path)
+        if date:
+            self.text_input.setText(date)
+            self.on_shared_parameter_changed()
+
+    def use_exif_date_per_image(self):
+        if self.current_image_index < 0:
+            QMessageBox.information(self, "提示", "请先选择一张图片")
+            return
+
+        image_path = self.images[self.current_image_index]
+        date = self.get_exif_date(image_path)
+        if date:
+            self.per_image_text_input.setText(date)
+            self.on_per_image_parameter_changed()
+
+    def get_exif_date(self, image_path):
+        # 拍摄日期来自共享的元数据索引（只读取文件头，已读取过的图片直接命中缓存）
+        date = get_metadata_index().get(image_path).capture_date
+        if date:
+            return date
+
+        try:
+            mod_time = os.path.getmtime(image_path)
+            from datetime import datetime
+            return datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d")
+        except:
+            return "Unknown-Date"
+
+    def export_all_images(self):
+        if not self.images:
+            QMessageBox.warning(self, "警告", "没有图片可导出")
+            return
+
+        output_path = self.output_path_label.text()
+        if output_path == "未选择":
+            QMessageBox.warning(self, "警告", "请先选择输出文件夹")
+            return
+
+        for image_path in self.images:
+            if os.path.dirname(image_path) == output_path:
+                reply = QMessageBox.question(self, "确认",
+                                             "输出文件夹与原文件夹相同，这可能会覆盖原文件。是否继续？",
+                                             QMessageBox.Yes | QMessageBox.No)
+                if reply == QMessageBox.No:
+                    return
+                break
+
+        # 上次未完成的导出中已完成的图片先写入导出清单，再对照清单只导出源文件或设置有变化的图片
+        job = self.create_export_job(output_path)
+        manifest = ExportManifest(output_path)
+        journal = ExportJournal(output_path)
+        recover_journal(journal, manifest)
+        try:
+            job, self.export_skipped, fingerprints = plan_incremental_export(
+                job, manifest, full=not job.shared_settings.get("incremental_export", True))
+        except ValueError as e:
+            # 不同文件夹中的同名图片会输出到同一个文件
+            QMessageBox.warning(self, "导出错误", f"{str(e)}\n请修改命名规则或移除其中一张图片")
+            return
+        if not job.images:
+            manifest.save()
+            journal.finish()
+            QMessageBox.information(self, "完成", f"所有 {self.export_skipped} 张图片都未变化，无需重新导出")
+            return
+
+        try:
+            journal.start(job.to_dict())
+        except OSError as e:
+            QMessageBox.warning(self, "导出错误", f"无法写入导出日志: {str(e)}")
+            return
+        self.start_export(job, ExportRecorder(manifest, journal, fingerprints))
+
+    def resume_export(self):
+        """从导出日志继续上次未完成的导出（使用上次导出时的设置）"""
+        output_path = self.output_path_label.text()
+        if output_path == "未选择":
+            QMessageBox.warning(self, "警告", "请先选择输出文件夹")
+            return
+
+        manifest = ExportManifest(output_path)
+        journal = ExportJournal(output_path)
+        job, completed = recover_journal(journal, manifest)
+        if job is None:
+            QMessageBox.information(self, "提示", "输出文件夹中没有未完成的导出")
+            return
+
+        journal.remove_temp_files(job.output_filepaths())
+        self.export_skipped = len(completed)
+        try:
+            job, _, fingerprints = plan_incremental_export(
+                job.with_images([path for path in job.images if path not in completed]), manifest, full=True)
+        except ValueError as e:
+            QMessageBox.warning(self, "导出错误", str(e))
+            return
+        if not job.images:
+            manifest.save()
+            journal.finish()
+            QMessageBox.information(self, "完成", f"上次导出的 {self.export_skipped} 张图片都已完成")
+            return
+        self.start_export(job, ExportRecorder(manifest, journal, fingerprints))
+
+    def start_export(self, job, recorder):
+        self.progress_dialog = QProgressDialog("正在导出图片...", "取消", 0, len(job.images), self)
+        self.progress_dialog.setWindowTitle("导出进度")
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        self.progress_dialog.show()
+
+        if job.shared_settings.get("parallel_export", True):
+            self.export_thread = ParallelWatermarkThread(job, job.shared_settings.get("export_workers", 0), recorder)
+        else:
+            self.export_thread = WatermarkThread(job, recorder)
+        self.export_thread.progress.connect(self.progress_dialog.setValue)
+        self.export_thread.finished.connect(self.export_finished)
+        self.export_thread.error.connect(self.export_error)
+        self.progress_dialog.canceled.connect(self.export_thread.cancel)
+        self.export_thread.start()
+
+    def export_finished(self):
+        # 关闭进度对话框会发出canceled信号，先记录导出是否被取消
+        canceled = self.export_thread.canceled
+        self.progress_dialog.close()
+        message = f"已成功导出 {self.export_thread.exported_count} 张图片"
+        if self.export_skipped:
+            message += f"，跳过 {self.export_skipped} 张无需重新导出的图片"
+        if canceled:
+            message += "。导出已取消，可以点击\"继续上次导出\"从未完成的图片继续"
+        elif self.export_thread.interrupted:
+            message += "。导出意外中断，可以点击\"继续上次导出\"从未完成的图片继续"
+        if tracer.enabled:
+            # 保存本次导出（以及之前的预览）的计时记录
+            events = tracer.save(os.environ.get(TRACE_ENV))
+            print(format_summary(summarize(events)))
+        QMessageBox.information(self, "完成", message)
+
+    def export_error(self, error_msg):
+        QMessageBox.warning(self, "导出错误", error_msg)
+
+    def create_export_job(self, output_path):
+        """冻结当前设置，生成导出任务快照（导出过程中不再读取界面状态）"""
+        self.save_shared_settings_from_ui()
+        shared_settings = self.shared_settings.copy()
+
+        # 自定义拖拽时记录预览图尺寸，用于换算拖拽坐标
+        if shared_settings["position"] == CUSTOM_POSITION and self.draggable_watermark:
+            shared_settings["custom_drag"] = True
+            preview_pixmap = self.preview_label.pixmap()
+            if preview_pixmap:
+                shared_settings["preview_size"] = (preview_pixmap.width(), preview_pixmap.height())
+
+        # 只有个性化设置与默认值不同的图片才使用个性化设置（只传递不同的键）
+        overrides = {image_path: settings.values for image_path, settings in self.per_image_settings.items()
+                     if settings.has_overrides}
+
+        return ExportJob(self.images, output_path, shared_settings, overrides)
+
+    def has_per_image_settings(self, image_path):
+        """检查图片是否有有效的个性化设置"""
+        settings = self.per_image_settings.get(image_path)
+        return settings is not None and settings.has_overrides
+
+    def get_per_image_settings(self, image_path):
+        """返回图片的个性化设置（未修改过的图片返回全部为默认值的设置，不保存）"""
+        settings = self.per_image_settings.get(image_path)
+        return settings if settings is not None else ImageOverrides()
+
+    def selected_image_paths(self):
+        return [self.images[index.row()] for index in self.image_list.selectionModel().selectedIndexes()]
+
+    def edit_per_image_settings(self):
+        """返回当前图片可修改的个性化设置
+
+        选中多张图片时返回这些图片共用的分组设置（以当前图片的设置为起点）；
+        单独修改分组中的一张图片时先复制一份，不影响分组中的其它图片。
+        """
+        image_path = self.images[self.current_image_index]
+        settings = self.per_image_settings.get(image_path)
+
+        selected = self.selected_image_paths()
+        if image_path not in selected:
+            selected.append(image_path)
+        if len(selected) > 1:
+            if self.group_overrides is None:
+                base = settings if settings is not None else ImageOverrides()
+                self.group_overrides = base.copy(group=True)
+                for path in selected:
+                    self.per_image_settings[path] = self.group_overrides
+            return self.group_overrides
+
+        if settings is None:
+            settings = self.per_image_settings[image_path] = ImageOverrides()
+        elif settings.group:
+            settings = self.per_image_settings[image_path] = settings.copy()
+        return settings
+
+    def on_image_selection_changed(self, selected, deselected):
+        # 选中的图片变化后，下一次修改会建立新的分组
+        self.group_overrides = None
+
+    def save_template(self):
+        name, ok = QInputDialog.getText(self, "保存模板", "请输入模板名称:")
+        if ok and name:
+            self.save_shared_settings_from_ui()
+
+            template = {
+                "shared_settings": self.shared_settings.copy()
+            }
+
+            templates_dir = os.path.join(os.path.expanduser("~"), ".watermark_templates")
+            os.makedirs(templates_dir, exist_ok=True)
+
+            template_path = os.path.join(templates_dir, f"{name}.json")
+            with open(template_path, 'w', encoding='utf-8') as f:
+                json.dump(template, f, ensure_ascii=False, indent=2)
+
+            self.load_template_list()
+            QMessageBox.information(self, "成功", "模板已保存")
+
+    def load_template(self):
+        if self.template_list.currentItem():
+            template_name = self.template_list.currentItem().text()
+            self.load_template_by_name(template_name)
+        else:
+            QMessageBox.warning(self, "警告", "请先选择一个模板")
+
+    def load_template_from_list(self, item):
+        template_name = item.text()
+        self.load_template_by_name(template_name)
+
+    def load_template_by_name(self, name):
+        templates_dir = os.path.join(os.path.expanduser("~"), ".watermark_templates")
+        template_path = os.path.join(templates_dir, f"{name}.json")
+
+        try:
+            with open(template_path, 'r', encoding='utf-8') as f:
+                template = json.load(f)
+
+            if "shared_settings" in template:
+                self.shared_settings.update(template["shared_settings"])
+                self.apply_shared_settings_to_ui()
+
+            self.update_preview()
+            QMessageBox.information(self, "成功", f"已加载模板: {name}")
+
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"无法加载模板: {str(e)}")
+
+    def delete_template(self):
+        if self.template_list.currentItem():
+            template_name = self.template_list.currentItem().text()
+
+            reply = QMessageBox.question(self, "确认", f"确定要删除模板 '{template_name}' 吗？",
+                                         QMessageBox.Yes | QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                templates_dir = os.path.join(os.path.expanduser("~"), ".watermark_templates")
+                template_path = os.path.join(templates_dir, f"{template_name}.json")
+
+                try:
+                    os.remove(template_path)
+                    self.load_template_list()
+                    QMessageBox.information(self, "成功", "模板已删除")
+                except Exception as e:
+                    QMessageBox.warning(self, "错误", f"无法删除模板: {str(e)}")
+        else:
+            QMessageBox.warning(self, "警告", "请先选择一个模板")
+
+    def load_template_list(self):
+        self.template_list.clear()
+
+        templates_dir = os.path.join(os.path.expanduser("~"), ".watermark_templates")
+        if os.path.exists(templates_dir):
+            for file in os.listdir(templates_dir):
+                if file.endswith(".json"):
+                    template_name = file[:-5]
+                    self.template_list.addItem(template_name)
+
+    def reset_rotation(self):
+        self.rotation_slider.setValue(0)
+
+    def reset_per_image_rotation(self):
+        self.per_image_rotation_slider.setValue(0)
+
+    def load_settings(self):
+        settings_path = os.path.join(os.path.expanduser("~"), ".watermark_settings.json")
+        if os.path.exists(settings_path):
+            try:
+                with open(settings_path, 'r', encoding='utf-8') as f:
+                    settings = json.load(f)
+
+                self.auto_load_check.setChecked(settings.get("auto_load_last", False))
+                self.image_cache_mb.setValue(settings.get("image_cache_mb", IMAGE_CACHE_MB))
+                self.proxy_cache_check.setChecked(settings.get("cache_proxies", False))
+                if settings.get("auto_load_last", False):
+                    last_template = settings.get("last_template")
+                    if last_template and os.path.exists(
+                            os.path.join(os.path.expanduser("~"), ".watermark_templates", f"{last_template}.json")):
+                        self.load_template_by_name(last_template)
+
+            except:
+                pass
+
+    def save_settings(self):
+        last_template = None
+        if self.template_list.currentItem():
+            last_template = self.template_list.currentItem().text()
+
+        settings = {
+            "auto_load_last": self.auto_load_check.isChecked(),
+            "last_template": last_template,
+            "image_cache_mb": self.image_cache_mb.value(),
+            "cache_proxies": self.proxy_cache_check.isChecked()
+        }
+
+        settings_path = os.path.join(os.path.expanduser("~"), ".watermark_settings.json")
+        with open(settings_path, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=2)
+
+    def closeEvent(self, event):
+        self.save_settings()
+        self.preview_worker.stop()
+        self.preview_worker.wait()
+        self.thumbnail_loader.shutdown()
+        event.accept()
+
+    def dragEnterEvent(self, event: QDragEnterEvent):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event: QDropEvent):
+        urls = event.mimeData().urls()
+        paths = [url.toLocalFile() for url in urls]
+
+        image_paths = [path for path in paths if path.lower().endswith(IMAGE_EXTENSIONS)]
+
+        if image_paths:
+            self.add_images(image_paths)
+        else:
+            QMessageBox.warning(self, "警告", "拖放的文件中没有支持的图片格式")
+
+        event.acceptProposedAction()
+
+
+# 运行应用
+def run_app():
+    try:
+        app = QApplication(sys.argv)
+        app.setStyle('Fusion')
+        window = WatermarkApp()
+        window.show()
+        return app.exec_()
+    except Exception as e:
+        print(f"程序运行错误: {str(e)}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
@@ -0,0 +1,235 @@
+import os
+import json
+import hashlib
+
+# 导出清单和导出日志 - 记录输出文件夹中每个输出对应的源文件和设置，增量导出时跳过未变化的图片；
+# 导出中断后根据日志继续。不依赖Qt
+
+MANIFEST_NAME = ".watermark_manifest.json"
+MANIFEST_VERSION = 1
+JOURNAL_NAME = ".watermark_export_journal.jsonl"
+
+# 输出先写入 ".文件名.进程号.tmp"，完成后重命名
+TEMP_SUFFIX = ".tmp"
+
+# 不影响输出内容的设置项，不参与设置指纹
+NON_RENDER_KEYS = ("parallel_export", "export_workers", "incremental_export")
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """源文件内容哈希（BLAKE2b）"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_fingerprint(settings):
+    """有效设置的指纹：设置相同（忽略导出方式等不影响输出的项）时指纹相同
+
+    图片水印还包含水印图片的大小和修改时间，替换水印图片后所有输出都会重新生成。
+    """
+    values = {key: value for key, value in settings.items() if key not in NON_RENDER_KEYS}
+    if values.get("type") == "image" and values.get("image_path"):
+        try:
+            stat = os.stat(values["image_path"])
+            values["image_stat"] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            values["image_stat"] = None
+    data = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class ExportManifest:
+    """输出文件夹中的导出清单
+
+    以输出文件相对于输出文件夹的路径为键，记录源文件路径、大小、修改时间、内容哈希和设置指纹。
+    源文件大小和修改时间都未变化时直接跳过，不读取文件内容；只有修改时间变化时
+    比较内容哈希，内容相同仍然跳过（例如文件被复制或touch过）。
+    清单损坏或版本不符时视为空清单，所有图片重新导出。
+    """
+
+    def __init__(self, output_path):
+        self.path = os.path.join(output_path, MANIFEST_NAME)
+        self.output_path = output_path
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_current(self, image_path, output_name, fingerprint):
+        """输出文件存在，且源文件和设置指纹都与记录一致时返回True"""
+        entry = self.entries.get(output_name)
+        if entry is None or entry["settings"] != fingerprint or entry["source"] != os.path.abspath(image_path):
+            return False
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return False
+        if stat.st_size != entry["size"]:
+            return False
+        if not os.path.exists(os.path.join(self.output_path, output_name)):
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+
+        # 只有修改时间变化：内容相同时更新记录的修改时间，下次不再读取内容
+        try:
+            if file_hash(image_path) != entry["hash"]:
+                return False
+        except OSError:
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def record(self, image_path, output_filepath, fingerprint, source_hash=None):
+        """记录一个导出成功的输出，返回记录"""
+        stat = os.stat(image_path)
+        entry = {
+            "source": os.path.abspath(image_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": source_hash or file_hash(image_path),
+            "settings": fingerprint
+        }
+        self.add_entry(output_filepath, entry)
+        return entry
+
+    def add_entry(self, output_filepath, entry):
+        self.entries[os.path.relpath(output_filepath, self.output_path)] = entry
+        self.dirty = True
+
+    def save(self):
+        """先写临时文件再替换，中断时不会留下损坏的清单"""
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(self.output_path, exist_ok=True)
+            temp_path = self.path + TEMP_SUFFIX
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"保存导出清单错误: {str(e)}")
+
+
+class ExportJournal:
+    """导出日志：记录进行中的导出，程序崩溃或取消后可以继续
+
+    第一行是任务快照，之后每完成一张图片追加一行并立即落盘。
+    全部图片处理完后删除日志；日志仍然存在说明上次导出没有完成。
+    """
+
+    def __init__(self, output_path):
+        self.path = os.path.join(output_path, JOURNAL_NAME)
+        self.output_path = output_path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def start(self, job_data):
+        """开始新的导出，覆盖之前的日志"""
+        os.makedirs(self.output_path, exist_ok=True)
+        self.write({"job": job_data}, 'w')
+
+    def add(self, image_path, output_filepath, entry):
+        """记录一张已完成的图片及其导出清单记录"""
+        self.write({"image": image_path, "output": output_filepath, "entry": entry}, 'a')
+
+    def write(self, record, mode):
+        with open(self.path, mode, encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self):
+        """返回 (任务快照字典, 已完成图片的记录列表)；没有日志或日志损坏时返回 (None, [])"""
+        job_data = None
+        completed = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 中断时可能留下不完整的最后一行
+                        continue
+                    if "job" in record:
+                        job_data = record["job"]
+                    elif "image" in record and "entry" in record:
+                        completed.append(record)
+        except OSError:
+            pass
+        return job_data, completed if job_data is not None else []
+
+    def finish(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def remove_temp_files(self, output_filepaths):
+        """删除中断时残留的临时文件
+
+        只删除本程序创建的临时文件：指定输出文件的 ".文件名.进程号.tmp" 和导出清单的临时文件，
+        输出文件夹中其它程序的临时文件不受影响。
+        """
+        names_by_directory = {}
+        for output_filepath in output_filepaths:
+            directory, name = os.path.split(output_filepath)
+            names_by_directory.setdefault(directory, set()).add(name)
+
+        temp_paths = [os.path.join(self.output_path, MANIFEST_NAME + TEMP_SUFFIX)]
+        for directory, names in names_by_directory.items():
+            try:
+                entries = os.listdir(directory or os.curdir)
+            except OSError:
+                continue
+            for entry in entries:
+                if not (entry.startswith(".") and entry.endswith(TEMP_SUFFIX)):
+                    continue
+                name, _, pid = entry[1:-len(TEMP_SUFFIX)].rpartition(".")
+                if pid.isdigit() and name in names:
+                    temp_paths.append(os.path.join(directory, entry))
+
+        for temp_path in temp_paths:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+class ExportRecorder:
+    """导出线程和命令行共用：每导出成功一张图片，写入导出日志和导出清单"""
+
+    def __init__(self, manifest, journal, fingerprints):
+        self.manifest = manifest
+        self.journal = journal
+        self.fingerprints = fingerprints
+
+    def record(self, image_path, output_filepath, source_hash=None):
+        try:
+            entry = self.manifest.record(image_path, output_filepath, self.fingerprints[image_path], source_hash)
+            self.journal.add(image_path, output_filepath, entry)
+        except OSError as e:
+            print(f"更新导出记录错误: {str(e)}")
+
+    def close(self, finished=True):
+        """保存导出清单；全部处理完（未取消）时删除导出日志"""
+        self.manifest.save()
+        if finished:
+            self.journal.finish()
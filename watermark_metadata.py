@@ -0,0 +1,152 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from watermark_cache import LRUCache
+
+# 图片元数据索引 - 只读取文件头中的EXIF（不解码像素），按路径、修改时间和大小缓存，
+# 缩略图、预览、导出和日期文本共用，不依赖Qt
+
+METADATA_CACHE_SIZE = 65536
+
+# EXIF标签
+ORIENTATION_TAG = 0x0112
+MAKE_TAG = 0x010F
+MODEL_TAG = 0x0110
+DATETIME_TAG = 0x0132
+EXIF_IFD_TAG = 0x8769
+DATETIME_ORIGINAL_TAG = 0x9003
+
+
+class ImageMetadata:
+    """图片头部信息：EXIF方向、拍摄日期（YYYY-MM-DD）、按方向修正后的尺寸和相机型号"""
+    __slots__ = ("orientation", "capture_date", "width", "height", "camera")
+
+    def __init__(self, orientation=1, capture_date=None, width=0, height=0, camera=None):
+        self.orientation = orientation
+        self.capture_date = capture_date
+        self.width = width
+        self.height = height
+        self.camera = camera
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+def header_exif(image):
+    """读取已打开图片的EXIF，不解码像素
+
+    PNG的 getexif() 在文件头中没有EXIF块时会解码整张图片，因此只使用打开时已读取的EXIF块。
+    """
+    if image.format == "PNG":
+        exif = Image.Exif()
+        data = image.info.get("exif")
+        if data:
+            exif.load(data)
+        return exif
+    return image.getexif()
+
+
+def exif_orientation(exif):
+    """EXIF方向标记，没有或无效时返回1"""
+    orientation = exif.get(ORIENTATION_TAG, 1)
+    return orientation if isinstance(orientation, int) and 1 <= orientation <= 8 else 1
+
+
+def exif_date(value):
+    """把EXIF日期时间（YYYY:MM:DD HH:MM:SS）转换为 YYYY-MM-DD，无效时返回None"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    date = value.strip().split()[0].replace(":", "-")
+    return date if len(date) == 10 and date[:4].isdigit() and date[:4] != "0000" else None
+
+
+def exif_text(value):
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "ignore")
+    return value.strip("\x00 ") if isinstance(value, str) else ""
+
+
+def metadata_from_image(image):
+    """从已打开（尚未解码）的图片提取元数据"""
+    width, height = image.size
+    try:
+        exif = header_exif(image)
+        orientation = exif_orientation(exif)
+        capture_date = exif_date(exif.get_ifd(EXIF_IFD_TAG).get(DATETIME_ORIGINAL_TAG)) or \
+            exif_date(exif.get(DATETIME_TAG))
+        make, model = exif_text(exif.get(MAKE_TAG)), exif_text(exif.get(MODEL_TAG))
+    except Exception:
+        # EXIF损坏时仍然返回尺寸
+        orientation, capture_date, make, model = 1, None, "", ""
+
+    # 型号通常已经包含厂商名称
+    camera = model if model.lower().startswith(make.lower()) else f"{make} {model}".strip()
+    if orientation >= 5:
+        width, height = height, width
+    return ImageMetadata(orientation, capture_date, width, height, camera or None)
+
+
+def read_metadata(path, image=None):
+    """读取图片元数据；image 是已经打开的同一文件时直接使用，不再重新打开"""
+    if image is not None:
+        return metadata_from_image(image)
+    with Image.open(path) as image:
+        return metadata_from_image(image)
+
+
+class MetadataIndex:
+    """图片元数据缓存（线程安全）
+
+    按 (绝对路径, 修改时间, 文件大小) 缓存，文件被修改后自动重新读取。
+    读取失败的文件返回默认值（方向为1、没有日期），同样被缓存。
+    """
+
+    def __init__(self, capacity=METADATA_CACHE_SIZE):
+        self.cache = LRUCache(capacity)
+
+    def get(self, path, image=None):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return ImageMetadata()
+
+        def read():
+            try:
+                return read_metadata(path, image)
+            except Exception as e:
+                print(f"读取图片信息错误: {str(e)}")
+                return ImageMetadata()
+
+        return self.cache.get_or_create((os.path.abspath(path), stat.st_mtime_ns, stat.st_size), read)
+
+    def extract_all(self, paths, workers=0):
+        """在线程池中并行读取一批图片（例如整个文件夹）的元数据，返回 {路径: 元数据}
+
+        只读取文件头，主要耗时在文件系统上，用线程即可并行；结果直接进入共享缓存。
+        """
+        paths = list(paths)
+        workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths) or 1))) as executor:
+            return dict(zip(paths, executor.map(self.get, paths)))
+
+    def stats(self):
+        return self.cache.stats()
+
+
+_metadata_index = None
+_metadata_index_lock = threading.Lock()
+
+
+def get_metadata_index():
+    """返回进程内共享的元数据索引"""
+    global _metadata_index
+    with _metadata_index_lock:
+        if _metadata_index is None:
+            _metadata_index = MetadataIndex()
+        return _metadata_index
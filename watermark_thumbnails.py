@@ -0,0 +1,106 @@
+import io
+import os
+import time
+import sqlite3
+import threading
+from PIL import Image
+
+# 缩略图缓存 - 保存在用户目录下的SQLite数据库中，按路径、文件大小和修改时间失效
+
+THUMBNAIL_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".watermark_thumbnails.db")
+THUMBNAIL_CACHE_VERSION = 1
+THUMBNAIL_CACHE_MAX_ENTRIES = 50000
+
+
+def file_key(path):
+    """缓存键：绝对路径、文件大小和修改时间（纳秒）"""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+class ThumbnailStore:
+    """持久化的缩略图缓存
+
+    每个文件一条记录，文件大小、修改时间或缩略图尺寸不一致时视为失效并重新生成。
+    缩略图以JPEG保存；打开时只保留最近写入的 max_entries 条记录。
+    数据库无法打开时缓存不可用，但不影响缩略图生成。
+    """
+
+    def __init__(self, db_path=THUMBNAIL_CACHE_PATH, max_entries=THUMBNAIL_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            self._conn = self.open()
+        except sqlite3.Error as e:
+            print(f"打开缩略图缓存错误: {str(e)}")
+
+    def open(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != THUMBNAIL_CACHE_VERSION:
+            conn.execute("DROP TABLE IF EXISTS thumbnails")
+            conn.execute(f"PRAGMA user_version = {THUMBNAIL_CACHE_VERSION}")
+        conn.execute("CREATE TABLE IF NOT EXISTS thumbnails ("
+                     "path TEXT PRIMARY KEY, file_size INTEGER, mtime_ns INTEGER, "
+                     "thumb_size INTEGER, data BLOB, created REAL)")
+        conn.execute("DELETE FROM thumbnails WHERE path NOT IN "
+                     "(SELECT path FROM thumbnails ORDER BY created DESC LIMIT ?)", (self.max_entries,))
+        conn.commit()
+        return conn
+
+    def get(self, key, thumb_size):
+        """返回缓存的缩略图，不存在或已失效时返回None"""
+        path, file_size, mtime_ns = key
+        with self._lock:
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT data FROM thumbnails WHERE path = ? AND file_size = ? AND mtime_ns = ? AND thumb_size = ?",
+                (path, file_size, mtime_ns, thumb_size)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        thumb = Image.open(io.BytesIO(row[0]))
+        thumb.load()
+        return thumb
+
+    def put(self, key, thumb_size, thumb):
+        path, file_size, mtime_ns = key
+        buffer = io.BytesIO()
+        thumb.save(buffer, "JPEG", quality=90)
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, file_size, mtime_ns, thumb_size, buffer.getvalue(), time.time()))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"保存缩略图缓存错误: {str(e)}")
+
+    def get_or_create(self, path, thumb_size, factory):
+        """命中时返回缓存的缩略图，否则调用 factory() 生成并保存"""
+        key = file_key(path)
+        thumb = self.get(key, thumb_size)
+        if thumb is None:
+            thumb = factory()
+            self.put(key, thumb_size, thumb)
+        return thumb
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,193 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+
+# 分阶段计时 - 默认关闭；开启后记录导出和预览各阶段的耗时，保存为Chrome Trace Event格式
+# （可在 chrome://tracing 或 https://ui.perfetto.dev 中打开），不依赖Qt
+#   命令行: python main.py batch ... --trace trace.json
+#   界面:   设置环境变量 WATERMARK_TRACE=trace.json 后启动，每次导出完成后写入
+
+TRACE_ENV = "WATERMARK_TRACE"
+STAGES = ("decode", "orientation", "resize", "layer", "composite", "encode", "write")
+# 界面长时间运行时只保留最近的事件
+MAX_EVENTS = 500000
+
+
+class Stage:
+    """一个计时阶段；nbytes 可以在阶段内设置（例如编码完成后才知道输出大小）"""
+    __slots__ = ("tracer", "name", "nbytes", "start")
+
+    def __init__(self, tracer, name, nbytes):
+        self.tracer = tracer
+        self.name = name
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.add(self.name, self.start, time.perf_counter_ns() - self.start, self.nbytes)
+        return False
+
+
+class NullStage:
+    """计时关闭时使用的空阶段，几乎没有开销"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+class Tracer:
+    """记录各阶段耗时事件（线程安全）
+
+    事件带有当前线程正在处理的图片路径（由 image() 设置）、进程号、线程号和字节数。
+    时间戳使用单调时钟，同一台机器上各进程的事件可以放在同一时间轴上。
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def stage(self, name, nbytes=0):
+        """with tracer.stage("decode") as stage: ...，关闭时返回空阶段"""
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, nbytes)
+
+    def image(self, path, category="export"):
+        """设置当前线程正在处理的图片和类别（export 或 preview），之后的事件都带上该图片"""
+        return ImageScope(self._local, path, category)
+
+    def add(self, name, start_ns, duration_ns, nbytes=0):
+        event = {
+            "name": name,
+            "cat": getattr(self._local, "category", "export"),
+            "ph": "X",
+            "ts": start_ns / 1000,
+            "dur": duration_ns / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": {"path": getattr(self._local, "path", None), "bytes": nbytes}
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def extend(self, events):
+        """合并其它进程（导出子进程）记录的事件"""
+        with self._lock:
+            self.events.extend(events)
+
+    def drain(self):
+        """取出并清空已记录的事件"""
+        with self._lock:
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    def save(self, path, events=None):
+        """保存为Chrome Trace Event JSON"""
+        events = self.drain() if events is None else events
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存计时记录错误: {str(e)}")
+        return events
+
+
+class ImageScope:
+    __slots__ = ("local", "path", "category", "previous")
+
+    def __init__(self, local, path, category):
+        self.local = local
+        self.path = path
+        self.category = category
+
+    def __enter__(self):
+        self.previous = (getattr(self.local, "path", None), getattr(self.local, "category", "export"))
+        self.local.path = self.path
+        self.local.category = self.category
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.local.path, self.local.category = self.previous
+        return False
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法百分位数（输入已排序）"""
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def self_durations(events):
+    """计算每个事件的独占耗时（减去嵌套在其中的子阶段，例如合成中首次生成的图层）"""
+    by_thread = {}
+    for event in events:
+        by_thread.setdefault((event["pid"], event["tid"]), []).append(event)
+
+    durations = []
+    for thread_events in by_thread.values():
+        thread_events.sort(key=lambda event: (event["ts"], -event["dur"]))
+        stack = []
+        for event in thread_events:
+            while stack and event["ts"] >= stack[-1][0]["ts"] + stack[-1][0]["dur"]:
+                durations.append(stack.pop())
+            if stack:
+                stack[-1][1] -= event["dur"]
+            stack.append([event, event["dur"]])
+        durations.extend(stack)
+    return [(event, max(0.0, duration)) for event, duration in durations]
+
+
+def summarize(events):
+    """按类别和阶段汇总独占耗时（毫秒）：次数、合计、p50、p95、最大值和字节数"""
+    groups = {}
+    for event, duration in self_durations(events):
+        group = groups.setdefault((event["cat"], event["name"]), {"durations": [], "bytes": 0})
+        group["durations"].append(duration / 1000)
+        group["bytes"] += event["args"].get("bytes") or 0
+
+    order = {stage: index for index, stage in enumerate(STAGES)}
+    summary = []
+    for (category, name), group in sorted(groups.items(), key=lambda item: (item[0][0], order.get(item[0][1], 99))):
+        durations = sorted(group["durations"])
+        summary.append({
+            "category": category, "stage": name, "count": len(durations), "total": sum(durations),
+            "p50": percentile(durations, 0.5), "p95": percentile(durations, 0.95), "max": durations[-1],
+            "bytes": group["bytes"]
+        })
+    return summary
+
+
+def format_summary(summary):
+    # 中文标题每个字占两列，宽度相应减少
+    lines = [f"{'阶段':<20} {'次数':>4} {'合计ms':>8} {'p50ms':>9} {'p95ms':>9} {'最大ms':>7} {'MB':>9}"]
+    for row in summary:
+        lines.append(f"{row['category'] + '/' + row['stage']:<22} {row['count']:>6} {row['total']:>10.1f} "
+                     f"{row['p50']:>9.1f} {row['p95']:>9.1f} {row['max']:>9.1f} {row['bytes'] / 1024 / 1024:>9.1f}")
+    return "\n".join(lines)
+
+
+# 进程内共享的计时器；环境变量 WATERMARK_TRACE 存在时自动开启
+tracer = Tracer()
+tracer.enable(bool(os.environ.get(TRACE_ENV)))
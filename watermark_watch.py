@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import time
+
+from concurrent.futures.process import BrokenProcessPool
+
+from watermark_export import ExportJob, IMAGE_EXTENSIONS, run_parallel_export, source_subfolders
+
+# 监视文件夹 - 文件写入完成后自动添加水印，不依赖Qt
+
+WATCH_LEDGER_NAME = ".watermark_watch.jsonl"
+
+
+class ProcessedLedger:
+    """已处理文件记录
+
+    每处理完一个文件追加一行JSON（路径、文件大小、修改时间、输出文件，失败时带 failed），
+    写入后立即落盘；重启后加载记录，同一版本的文件（包括处理失败的）不会再次处理。
+    文件被修改后大小或修改时间变化，会重新处理。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = set()
+        self.failed = set()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        key = (record["path"], record["size"], record["mtime_ns"])
+                        self.entries.add(key)
+                        if record.get("failed"):
+                            self.failed.add(key)
+                    except (ValueError, KeyError):
+                        # 中断时可能留下不完整的最后一行
+                        continue
+        except OSError:
+            pass
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key, output_filepath=None, failed=False):
+        path, size, mtime_ns = key
+        record = {"path": path, "size": size, "mtime_ns": mtime_ns, "output": output_filepath}
+        if failed:
+            record["failed"] = True
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries.add(key)
+        if failed:
+            self.failed.add(key)
+
+
+class FolderWatcher:
+    """轮询监视一个或多个文件夹，把写入完成的新图片批量交给进程池处理
+
+    文件大小和修改时间在 settle 秒内保持不变（或修改时间已早于 settle 秒）时视为写入完成。
+    同一轮扫描中就绪的文件作为一个导出任务并行处理，输出文件夹中保持监视文件夹的子文件夹结构
+    （监视多个文件夹时再按文件夹名称分开）。处理失败的文件记录在已处理文件记录中，
+    在内容变化前不再重试（重启后也不会）。
+    """
+
+    def __init__(self, folders, output_path, shared_settings, settle=2.0, workers=0, ledger=None):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.output_path = output_path
+        self.shared_settings = shared_settings
+        self.settle = settle
+        self.workers = workers
+        self.ledger = ledger if ledger is not None else ProcessedLedger(
+            os.path.join(output_path, WATCH_LEDGER_NAME))
+        self.pending = {}
+
+    def scan(self):
+        """返回监视文件夹中所有图片的 (路径, 大小, 修改时间)"""
+        exclude = os.path.realpath(self.output_path)
+        for folder in self.folders:
+            for root, dirs, files in os.walk(folder):
+                dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(root, d)) != exclude]
+                for file in files:
+                    if not file.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime_ns
+
+    def poll(self, now=None):
+        """扫描一次，返回已写入完成、尚未处理的文件"""
+        now = time.time() if now is None else now
+        ready = []
+        seen = set()
+
+        for key in self.scan():
+            path, size, mtime_ns = key
+            seen.add(path)
+            if key in self.ledger:
+                self.pending.pop(path, None)
+                continue
+
+            previous = self.pending.get(path)
+            if previous and previous[0] == key:
+                stable = now - previous[1] >= self.settle
+            else:
+                self.pending[path] = (key, now)
+                stable = False
+
+            if stable or now - mtime_ns / 1e9 >= self.settle:
+                self.pending.pop(path, None)
+                ready.append(key)
+
+        # 已删除的文件不再等待
+        for path in list(self.pending):
+            if path not in seen:
+                del self.pending[path]
+        return ready
+
+    def process(self, keys):
+        """并行处理一批文件，返回 (已处理（成功或失败）的文件, 失败的文件数)
+
+        子进程异常退出时，正在处理的文件记为失败，其余文件留到下一轮扫描，用新的进程池处理。
+        """
+        os.makedirs(self.output_path, exist_ok=True)
+        by_path = {key[0]: key for key in keys}
+        images = list(by_path)
+        job = ExportJob(images, self.output_path, self.shared_settings,
+                        subfolders=source_subfolders(images, self.folders))
+        processed = []
+        failed = []
+
+        def on_result(image_path, error, result):
+            key = by_path[image_path]
+            processed.append(key)
+            if error:
+                failed.append(key)
+                self.ledger.add(key, failed=True)
+                print(f"导出图片 {os.path.basename(image_path)} 失败: {error}", file=sys.stderr)
+            else:
+                self.ledger.add(key, result[0])
+
+        try:
+            run_parallel_export(job, self.workers, on_result)
+        except BrokenProcessPool as e:
+            print(f"{str(e)}，未处理的文件将在下一轮用新的进程处理", file=sys.stderr)
+        return processed, len(failed)
+
+    def run(self, interval=2.0, once=False, on_batch=None):
+        """持续监视；once 为 True 时处理完当前所有文件后返回
+
+        每处理完一批调用 on_batch(数量, 失败数, 用时, 输入字节数)，只统计实际处理了的文件
+        （进程池异常时未提交的文件留到下一轮，不计入本批）。
+        """
+        while True:
+            ready = self.poll()
+            if ready:
+                start = time.perf_counter()
+                processed, failed = self.process(ready)
+                elapsed = time.perf_counter() - start
+                if on_batch and processed:
+                    on_batch(len(processed), failed, elapsed, sum(key[1] for key in processed))
+            elif once and not self.pending:
+                return
+            time.sleep(interval if not (once and self.pending) else min(interval, self.settle))